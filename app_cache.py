@@ -0,0 +1,61 @@
+"""
+app_cache.py
+
+This module locates the per-user cache directory used for the application's on-disk caches (tool manifest, Steam
+library discovery, ...), and provides content_hash() for caches keyed by file contents. Apart from the backup store
+(backup_store.py), nothing stored here is essential: every cache can be deleted at any time and is rebuilt.
+data_dir() locates the per-user data directory, for data that is not a cache (the settings store).
+
+Location:
+- Windows: %LOCALAPPDATA%\\rwr_tweak (cache), %APPDATA%\\rwr_tweak (data)
+- Other platforms: $XDG_CACHE_HOME/rwr_tweak, or ~/.cache/rwr_tweak (cache); $XDG_DATA_HOME/rwr_tweak, or
+  ~/.local/share/rwr_tweak (data)
+- The RWR_TWEAK_CACHE_DIR and RWR_TWEAK_DATA_DIR environment variables override the locations.
+
+Dependencies:
+- Standard Python modules: os, sys, hashlib.
+"""
+
+import hashlib
+import os
+import sys
+
+# Read size used when hashing files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def cache_dir(*parts):
+    """Returns (and creates) the cache directory, or a subdirectory of it."""
+    base = os.environ.get("RWR_TWEAK_CACHE_DIR")
+    if not base:
+        if sys.platform == "win32":
+            root = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        else:
+            root = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        base = os.path.join(root, "rwr_tweak")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_dir(*parts):
+    """Returns (and creates) the data directory, or a subdirectory of it."""
+    base = os.environ.get("RWR_TWEAK_DATA_DIR")
+    if not base:
+        if sys.platform == "win32":
+            root = os.environ.get("APPDATA") or os.path.expanduser("~\\AppData\\Roaming")
+        else:
+            root = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        base = os.path.join(root, "rwr_tweak")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def content_hash(path):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -8,36 +8,49 @@ discovery and management of image editing tools (plugins), and updates the GUI (
 to user actions or changes in application state.
 
 Key responsibilities:
-- Opening, saving, and resetting images, including backup management.
-- Loading and saving tool settings in YAML format.
-- Applying a chain of image processing tools to the loaded image.
-- Managing zoom and display modes for image viewing.
+- Opening, saving, and resetting images, including backup management. Saves are encoded and written atomically
+  on a background thread; Save As then continues editing the saved file from the array already in memory.
+  Originals are kept in a deduplicated per-user BackupStore, filled on the same I/O thread. Reset swaps back to
+  the decoded original in memory and restores the file on disk in the background.
+- Loading and saving tool settings in YAML format, and in the optional SettingsStore (an indexed SQLite database)
+  from which an opened image gets its last saved settings, if it is still the unprocessed file they apply to.
+- Applying a chain of image processing tools to the loaded image (via the ToolPipeline).
+- Managing zoom and display modes for image viewing, with a mipmap pyramid for zoomed-out views.
+- Coalescing tool change events into at most one refresh per frame, at a rate chosen in the View menu; with
+  Trace Timing on, the status bar also counts the frames rendered and the changes coalesced.
+- Undo/redo of tool changes (a SettingsHistory of settings deltas), with recent rendered results kept in a
+  memory-capped cache so stepping back and forth between recent states needs no pipeline run.
+- Running the pipeline on a background worker thread, discarding superseded results.
+- Rendering slider drags through a display-sized proxy of the image, with full resolution on release.
 - Dynamically loading tool plugins from the 'tools' package.
 - Updating the GUI with the current image and settings.
+- Optional per-stage timing (profiling.tracer), shown in the status bar and exportable as a Chrome trace.
 
 Dependencies:
-- OpenCV (cv2), PIL, tkinter, PyYAML, and custom modules: image_processor, config_manager, tools.
+- OpenCV (cv2), PIL, tkinter, PyYAML, and custom modules: image_processor, config_manager, pipeline, tools.
 
 Intended to be used as the central controller in a Tkinter-based image editing application.
 """
 
-from posixpath import isabs
-import shutil
+import copy
 import os
-import cv2
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk
 
-import importlib
-import pkgutil
-import inspect
-
-from numpy import save
+from lazy_import import lazy_import
 import tools
-from tools.base_tool import BaseTool
+from tools.base_tool import ToolSettings
 
-from image_processor import ImageProcessor
+from image_processor import ImageProcessor, ImagePyramid, DecodedImageCache
+from pipeline import ToolPipeline, PipelineCancelled, PingPongBuffers, StageCache, build_stages, freeze_settings
 from config_manager import ConfigManager
+import app_cache
+from backup_store import BackupStore
+from history import SettingsHistory
+import settings_store
+from profiling import tracer
 # from tools.transparency_tool import TransparencyTool
 # from tools.color_tool import ColorTool
 
@@ -46,21 +59,87 @@ if TYPE_CHECKING:
     from gui.main_window import MainWindow
     # from tools.base_tool import BaseTool
 
+# Loaded on first use, so the window can appear before OpenCV and Pillow are imported
+cv2 = lazy_import("cv2")
+Image = lazy_import("PIL.Image")
+
 
 class AppController:
+    # How often (ms) the Tk thread checks for finished pipeline results
+    RESULT_POLL_MS = 10
+    # How often (ms) the Tk thread checks whether a background save or backup has finished
+    IO_POLL_MS = 50
+    # Memory budgets of the undo history: settings deltas, and rendered results of recent history points
+    HISTORY_BYTES = 1024 * 1024
+    HISTORY_RESULT_BYTES = 256 * 1024 * 1024
+    # Memory budget of the pipeline's StageCache. Interactive renders write their final pass into the ping-pong
+    # buffers, so only outputs of stages before a non-pointwise tool could be cached. All current tools are
+    # pointwise and fuse into that final pass, which leaves the cache nothing to hold, so it is off. Raise this
+    # for tools that must run through apply(): a change to a later tool then resumes from their cached output.
+    STAGE_CACHE_BYTES = 0
+
     def __init__(self):
         self.view = None
         self.image_path = None
-        self.backup_path = None
+        self._backup_future = None # Backup of the current image's original in the backup store
         self.config_path = None
 
         self.original_image_cv = None
         self.processed_image_cv = None
+        # The decoded original as opened (read-only) and the content hash of the file it came from, so a reset
+        # whose backup has the same content only needs a display refresh
+        self._pristine = (None, None)
+
+        # Proxy pipeline: a display-sized copy of the original that is processed while a slider is dragged
+        self.interacting = False
+        self.proxy_image_cv = None
+        self.proxy_processed_cv = None
+        self._full_res_stale = False
+
+        # Render scheduler: slider events are coalesced into at most one refresh per frame
+        self.target_fps = 30.0
+        self.render_stats = {'events': 0, 'coalesced': 0, 'dropped': 0, 'frames': 0, 'stale': 0}
+        self._render_job = None
+        self._pending_tools = set()
+        self._last_render_time = 0.0
+        self._settings_version = 0
+
+        # Background processing: one worker thread, results handed back to Tk by polling with root.after
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline")
+        self._results = queue.Queue()
+        self._generation = 0
+        self._jobs_in_flight = 0
+        self._poll_job = None
+
+        # Backups and saves run on one I/O thread, in order, so a save never overtakes the backup of the file it
+        # replaces, and the editor stays responsive while they run
+        self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="io")
+        self.backup_store = BackupStore()
+
+        # Two preallocated frames per resolution that worker runs alternate between
+        self.frame_buffers = PingPongBuffers()
+        self.proxy_buffers = PingPongBuffers()
         
-        self.processor = ImageProcessor() 
+        # Mipmaps of processed_image_cv for zoomed-out display, and the last array converted for display
+        self.pyramid = ImagePyramid()
+        self._display_pil = (None, None)
+        
+        # Decoded images are cached on disk, so reopening a texture maps it instead of decoding the PNG again
+        self.processor = ImageProcessor(cache=DecodedImageCache())
+        self.pipeline = ToolPipeline(cache_bytes=self.STAGE_CACHE_BYTES)
         self.config_manager = ConfigManager()
 
         self.settings = {}
+        self._settings_store = None # Opened on first use, see _get_settings_store
+        self._settings_store_opened = False
+        self._preset = None # (name, settings) of the last loaded settings file
+
+        # Undo/redo: settings deltas, plus full-resolution results of recently visited settings
+        self.history = SettingsHistory(self.HISTORY_BYTES)
+        self.history_results = StageCache(self.HISTORY_RESULT_BYTES)
+        self._restoring_settings = False # True while tool widgets are being set from stored settings
+        self._interaction_count = 0 # Identifies the current slider drag, so its changes merge into one step
+        self._history_menu_state = None
         
         self.zoom_level = 1.0
         self.display_mode = 'fit' # 'fit' or 'actual'
@@ -73,8 +152,9 @@ class AppController:
 
     def _convert_cv_to_pil(self, cv_image):
         if cv_image is None: return None
-        rgb_image = cv2.cvtColor(cv_image, cv2.COLOR_BGRA2RGBA)
-        return Image.fromarray(rgb_image)
+        with tracer.span("convert_cv_to_pil"):
+            rgb_image = cv2.cvtColor(cv_image, cv2.COLOR_BGRA2RGBA)
+            return Image.fromarray(rgb_image)
 
     def open_image_dialog(self):
         file_path = filedialog.askopenfilename(
@@ -87,7 +167,14 @@ class AppController:
         try:
             self.image_path = file_path
             self._backup_original()
+            self.pipeline.stage_cache.forget()
+            self._clear_history()
             self.original_image_cv = self.processor.load(file_path)
+            self.original_image_cv.flags.writeable = False # Tools write into their own buffers, never the original
+            self._pristine = (self.original_image_cv, self._file_digest(file_path))
+            self.processed_image_cv = None
+            self._load_stored_settings(file_path, self._pristine[1])
+            self.proxy_image_cv = self.proxy_processed_cv = None
             self.config_path = f"{self.image_path}.yaml"
             # self.settings = self.config_manager.load(self.config_path)
             
@@ -114,43 +201,341 @@ class AppController:
         Updates the GUI with the current image and settings.
         This is called after any change to the image or settings.
         """
-        self._apply_all_tool_effects() # Process the image
-        self.update_view()           # Display the result
+        self._settings_changed()
+        self._render_pending()       # Process and display the image on the worker
         if self.view:
             self.view.update_status_bar(self.image_path, self.config_path) # new
-            self.view.load_tool_settings(self.settings)
+            self._load_tool_widgets()
 
     def _apply_all_tool_effects(self):
         """
-        The new processing pipeline. It chains the tools together.
+        The new processing pipeline. It chains the tools together, fusing
+        consecutive lookup-table tools into a single pass over the image.
         """
         if self.original_image_cv is None:
             self.processed_image_cv = None
             return
 
-        # Start with a fresh copy of the original image
-        current_image = self.original_image_cv.copy()
-        
-        # Sequentially apply each tool's effect
-        for tool_name, tool_instance in self.available_tools.items():
-            if tool_name in self.settings:
-                current_image = tool_instance.apply(current_image)
-        
-        self.processed_image_cv = current_image
+        with tracer.span("pipeline"):
+            self.processed_image_cv = self.pipeline.run(self.original_image_cv, self._active_stages())
+
+    def _active_stages(self):
+        """Returns the (tool_name, tool_instance, settings) stages that have settings, in tool order."""
+        return build_stages(self.available_tools, self.settings)
 
     def update_view(self):
         """Updates the GUI with the currently processed image data."""
-        if self.view and self.processed_image_cv is not None:
-            pil_image = self._convert_cv_to_pil(self.processed_image_cv)
-            self.view.update_display(pil_image)
-        elif self.view:
-             self.view.update_display(None)
+        if not self.view:
+            return
+        if not self.is_image_loaded():
+            self.view.update_display(None)
+            return
+
+        full_size = (self.original_image_cv.shape[1], self.original_image_cv.shape[0])
+        if self.interacting and self._proxy_matches_display():
+            # While dragging, show the proxy result; the view scales it as if it were full size
+            display_image = self.proxy_processed_cv
+        else:
+            # Resample from the nearest pyramid level at least as large as the displayed size
+            self.pyramid.set_base(self.processed_image_cv)
+            with tracer.span("pyramid"):
+                display_image = self.pyramid.level_for_scale(self._display_scale())
+
+        if display_image is not None:
+            if self._display_pil[0] is not display_image: # Zooming and panning reuse the last conversion
+                self._display_pil = (display_image, self._convert_cv_to_pil(display_image))
+            pil_image = self._display_pil[1]
+            self.view.update_display(pil_image, full_size=full_size)
+            tracer.frame_presented()
+            if tracer.enabled:
+                self.view.update_perf_status(f"{tracer.summary()} | {self._render_summary()}")
+        elif not self._jobs_in_flight:
+            self.view.update_display(None)
 
     def apply_changes(self, tool_name, tool_settings):
+        """
+        Records the latest settings for a tool (a ToolSettings from its panel) and schedules a refresh.
+        Events arriving before the next frame are coalesced; only the latest settings are rendered.
+        """
         if not self.is_image_loaded(): return
+        if isinstance(tool_settings, ToolSettings):
+            # Kept as plain dictionaries, the format of settings files, the settings store and the history
+            tool_settings = tool_settings.to_dict()
+        previous = self.settings.get(tool_name)
+        if previous == tool_settings: return # e.g. a widget echoing settings that were just restored
+        tracer.mark_input()
+        self.render_stats['events'] += 1
+        if not self._restoring_settings:
+            self._record_history(tool_name, previous, tool_settings)
         self.settings[tool_name] = tool_settings
-        self._apply_all_tool_effects()
+        self._settings_changed()
+        self._request_render(tool_name)
+
+    # --- Undo / redo ---
+    def _record_history(self, tool_name, before, after):
+        merge_key = self._interaction_count if self.interacting else None
+        if self.history.record(tool_name, copy.deepcopy(before), copy.deepcopy(after), merge_key):
+            # A new step starts here: keep the result of the state being left, for an instant undo
+            self._remember_result()
+        self._update_history_menu()
+
+    def _settings_signature(self):
+        return [(tool_name, freeze_settings(settings)) for tool_name, _, settings in self._active_stages()]
+
+    def _remember_result(self):
+        """Caches the full-resolution result of the current settings, if it is up to date."""
+        image = self.processed_image_cv
+        if image is None or self._full_res_stale or image is self.original_image_cv:
+            return
+        if self.frame_buffers.owns(image):
+            image = image.copy() # Later renders overwrite the ping-pong buffers
+        self.history_results.put(self.original_image_cv, self._settings_signature(), image, None)
+
+    def undo(self):
+        """Reverts the most recent tool change (a whole slider drag counts as one change)."""
+        if not self.is_image_loaded(): return
+        self._remember_result()
+        step = self.history.undo()
+        if step is not None:
+            self._restore_settings(*step)
+
+    def redo(self):
+        """Re-applies the most recently undone tool change."""
+        if not self.is_image_loaded(): return
+        self._remember_result()
+        step = self.history.redo()
+        if step is not None:
+            self._restore_settings(*step)
+
+    def _restore_settings(self, tool_name, settings):
+        """Puts back stored settings for one tool (or all tools, if tool_name is None) without recording history."""
+        if tool_name is None:
+            self.settings = copy.deepcopy(settings)
+        elif settings is None:
+            self.settings.pop(tool_name, None)
+        else:
+            self.settings[tool_name] = copy.deepcopy(settings)
+        self._settings_changed()
+
+        cached = self.history_results.get(self.original_image_cv, self._settings_signature())
+        if cached is not None:
+            # Visited recently: show the stored result right away
+            self._generation += 1 # Anything in flight is for other settings
+            self._cancel_pending_render()
+            self.processed_image_cv = cached[0]
+            self._full_res_stale = False
+            self.pyramid.set_base(None)
+            self._display_pil = (None, None)
+            self.update_view()
+        else:
+            self._request_render(tool_name)
+
+        if self.view:
+            self._load_tool_widgets()
+        self._update_history_menu()
+
+    def _load_tool_widgets(self):
+        """Sets the tool widgets from self.settings; the change callbacks they fire are not recorded as history."""
+        self._restoring_settings = True
+        try:
+            self.view.load_tool_settings(self.settings)
+        finally:
+            self._restoring_settings = False
+
+    def _clear_history(self):
+        self.history.clear()
+        self.history_results.forget()
+        self._update_history_menu()
+
+    def _update_history_menu(self):
+        state = (self.history.can_undo(), self.history.can_redo())
+        if self.view and state != self._history_menu_state:
+            self._history_menu_state = state
+            self.view.update_history_menu(*state)
+
+    def _settings_changed(self):
+        """Marks the full-resolution result as out of date for the current settings."""
+        self._settings_version += 1
+        self._full_res_stale = True
+
+    def _request_render(self, tool_name=None):
+        """Schedules a refresh for the next frame, unless one is already scheduled."""
+        if self._render_job is not None:
+            # A frame is already scheduled; it will pick up these settings
+            self.render_stats['coalesced'] += 1
+            if tool_name in self._pending_tools:
+                self.render_stats['dropped'] += 1 # The previous value for this tool is never rendered
+            if tool_name is not None:
+                self._pending_tools.add(tool_name)
+            return
+
+        if not self.view:
+            self._render_pending()
+            return
+
+        if tool_name is not None:
+            self._pending_tools.add(tool_name)
+        frame_interval = 1.0 / self.target_fps
+        delay = max(0.0, self._last_render_time + frame_interval - time.perf_counter())
+        self._render_job = self.view.root.after(int(delay * 1000), self._render_pending)
+
+    def set_target_fps(self, fps):
+        """Sets the maximum number of pipeline+display refreshes per second."""
+        self.target_fps = max(1.0, float(fps))
+
+    def _render_summary(self):
+        """Returns how many tool changes were rendered and coalesced, for the timing status bar."""
+        stats = self.render_stats
+        return (f"{stats['frames']} frames for {stats['events']} changes, {stats['dropped']} never shown, "
+                f"{stats['stale']} stale")
+
+    def _render_pending(self):
+        """Starts one pipeline run with the latest recorded settings; the display refreshes when it finishes."""
+        self._cancel_pending_render()
+        self._last_render_time = time.perf_counter()
+        if not self.is_image_loaded(): return
+        self.render_stats['frames'] += 1
+
+        if self.interacting and self._update_proxy() is not None:
+            # Only the proxy is processed during a drag; full resolution follows on release
+            self._submit_render('proxy', self.proxy_image_cv)
+        else:
+            self._submit_render('full', self.original_image_cv)
+
+    def _cancel_pending_render(self):
+        if self._render_job is not None and self.view:
+            self.view.root.after_cancel(self._render_job)
+        self._render_job = None
+        self._pending_tools.clear()
+
+    # --- Background processing ---
+    def _submit_render(self, kind, source):
+        """
+        Runs the pipeline for `source` on the worker thread. Starting a new run supersedes
+        any run still in flight: it is cancelled between passes and its result is discarded.
+        """
+        self._generation += 1
+        # Write into whichever preallocated frame is not holding the result on screen
+        if kind == 'proxy':
+            out = self.proxy_buffers.acquire(source.shape, source.dtype, keep=self.proxy_processed_cv)
+        else:
+            out = self.frame_buffers.acquire(source.shape, source.dtype, keep=self.processed_image_cv)
+        job = (self._generation, self._settings_version, kind, source, self._active_stages(), out)
+
+        if not self.view:
+            self._publish_result(job, self.pipeline.run(source, job[4], out=out))
+            return
+
+        self._jobs_in_flight += 1
+        self._executor.submit(self._render_worker, job)
+        if self._poll_job is None:
+            self._poll_job = self.view.root.after(self.RESULT_POLL_MS, self._poll_results)
+
+    def _render_worker(self, job):
+        """Worker thread body. Never touches Tk; results are handed back through a queue."""
+        generation, _, _, source, stages, out = job
+        try:
+            with tracer.span("pipeline"):
+                result = self.pipeline.run(source, stages, cancelled=lambda: generation != self._generation, out=out)
+        except PipelineCancelled:
+            result = None
+        except Exception as e:
+            print(f"Error processing image: {e}")
+            result = None
+        self._results.put((job, result))
+
+    def _poll_results(self):
+        """Main-thread side of the worker: publishes finished results, re-arming itself while work is in flight."""
+        self._poll_job = None
+        while True:
+            try:
+                job, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._jobs_in_flight -= 1
+            if result is not None:
+                self._publish_result(job, result)
+        if self._jobs_in_flight > 0 and self.view:
+            self._poll_job = self.view.root.after(self.RESULT_POLL_MS, self._poll_results)
+
+    def _publish_result(self, job, result):
+        """Stores a finished pipeline result and refreshes the display, unless it has been superseded."""
+        generation, settings_version, kind, source, _, _ = job
+        if generation != self._generation:
+            self.render_stats['stale'] += 1
+            return
+        # The result may live in a reused buffer, so anything derived from the previous one is dropped
+        self._display_pil = (None, None)
+        if kind == 'proxy':
+            if source is not self.proxy_image_cv: return
+            self.proxy_processed_cv = result
+        else:
+            if source is not self.original_image_cv: return
+            self.processed_image_cv = result
+            self.pyramid.set_base(None)
+            if settings_version == self._settings_version:
+                self._full_res_stale = False
         self.update_view()
+
+    # --- Proxy (interactive) rendering ---
+    def watch_slider(self, widget):
+        """Marks a widget as an interactive control: dragging it renders through the proxy pipeline."""
+        widget.bind("<ButtonPress-1>", lambda e: self.begin_interaction(), add="+")
+        widget.bind("<ButtonRelease-1>", lambda e: self.end_interaction(), add="+")
+
+    def begin_interaction(self):
+        self.interacting = True
+        self._interaction_count += 1
+
+    def end_interaction(self):
+        """Leaves interactive mode and renders the final result at full resolution."""
+        self.interacting = False
+        if self.is_image_loaded() and self._full_res_stale:
+            self._request_render() # The next frame renders at full resolution
+
+    def _ensure_full_resolution(self):
+        """Makes sure processed_image_cv reflects the current settings at full resolution, computing it right away if needed."""
+        if self._full_res_stale:
+            self._generation += 1 # Anything in flight is now superseded by this result
+            self._apply_all_tool_effects()
+            self._full_res_stale = False
+
+    def _display_scale(self):
+        """Returns the scale at which the image is currently shown on the canvas."""
+        if self.display_mode == 'fit' and self.view:
+            canvas_width, canvas_height = self.view.get_canvas_size()
+            img_h, img_w = self.original_image_cv.shape[:2]
+            return min(canvas_width / img_w, canvas_height / img_h)
+        return self.zoom_level
+
+    def _proxy_size(self):
+        """Returns the (width, height) of the proxy for the current view, or None if full resolution is needed."""
+        scale = self._display_scale()
+        if scale <= 0 or scale >= 1.0:
+            return None
+        img_h, img_w = self.original_image_cv.shape[:2]
+        return max(1, round(img_w * scale)), max(1, round(img_h * scale))
+
+    def _update_proxy(self):
+        """Rebuilds the downscaled original if the display scale changed. Returns it, or None if not applicable."""
+        proxy_size = self._proxy_size()
+        if proxy_size is None:
+            self.proxy_image_cv = self.proxy_processed_cv = None
+            return None
+        if self.proxy_image_cv is None or (self.proxy_image_cv.shape[1], self.proxy_image_cv.shape[0]) != proxy_size:
+            if self.proxy_image_cv is not None:
+                self.pipeline.stage_cache.forget(self.proxy_image_cv)
+            self.proxy_image_cv = cv2.resize(self.original_image_cv, proxy_size, interpolation=cv2.INTER_AREA)
+            self.proxy_image_cv.flags.writeable = False
+            self.proxy_processed_cv = None
+        return self.proxy_image_cv
+
+    def _proxy_matches_display(self):
+        """True if the latest proxy result was rendered for the current display scale."""
+        if self.proxy_processed_cv is None:
+            return False
+        proxy_size = self._proxy_size()
+        return proxy_size is not None and (self.proxy_processed_cv.shape[1], self.proxy_processed_cv.shape[0]) == proxy_size
     
     def save_image(self, save_path=None):
         if not self.is_image_loaded():
@@ -160,12 +545,70 @@ class AppController:
         if save_path is None: save_path = self.image_path
         
         try:
-            self.processor.save(save_path, self.processed_image_cv) # Save the final processed data
-            self.config_manager.save(f"{save_path}.yaml", self.settings)
-            if save_path != self.image_path: self.open_image(save_path)
-            messagebox.showinfo("Success", f"Image and settings saved to:\n{save_path}")
+            self._ensure_full_resolution()
         except Exception as e:
             messagebox.showerror("Save Error", f"Could not save: {e}")
+            return
+
+        image = self.processed_image_cv
+        if self.frame_buffers.owns(image):
+            # Later renders write into the ping-pong buffers, so the save gets its own copy
+            image = image.copy()
+        job = (save_path, image, copy.deepcopy(self.settings), self.image_path, self.original_image_cv,
+               self._current_preset(), self._source_digest())
+        self._get_settings_store() # Opened here on the Tk thread, before the I/O thread uses it
+        future = self._io_executor.submit(self._save_worker, job)
+        self._when_done(future, lambda future: self._finish_save(future, job))
+
+    def _save_worker(self, job):
+        """Runs on the I/O thread: writes the image and its settings."""
+        save_path, image, settings, _, _, preset, source_hash = job
+        with tracer.span("save"):
+            content_hash = self.processor.save(save_path, image) # Save the final processed data
+            self.config_manager.save(f"{save_path}.yaml", settings)
+            store = self._get_settings_store()
+            if store is not None:
+                store.put(save_path, settings, content_hash, preset, source_hash)
+        return content_hash
+
+    def _when_done(self, future, callback):
+        """Calls callback(future) on the Tk thread once a background I/O job has finished."""
+        if self.view is None:
+            future.exception() # No Tk loop to poll from: wait for the job
+            callback(future)
+        elif future.done():
+            callback(future)
+        else:
+            self.view.root.after(self.IO_POLL_MS, self._when_done, future, callback)
+
+    def _finish_save(self, future, job):
+        """Runs on the Tk thread once a save is done: reports the outcome and, for Save As, switches to the saved file."""
+        save_path, image, settings, image_path, original, _, _ = job
+        error = future.exception()
+        if error is not None:
+            messagebox.showerror("Save Error", f"Could not save: {error}")
+            return
+
+        # Continue with the saved file, unless another image has been opened in the meantime
+        if save_path != image_path and self.image_path == image_path and self.original_image_cv is original:
+            self._adopt_saved_image(save_path, image, future.result())
+        messagebox.showinfo("Success", f"Image and settings saved to:\n{save_path}")
+
+    def _adopt_saved_image(self, save_path, image, content_hash):
+        """
+        Makes a just-saved file the image being edited, like open_image() would, but from the array already in
+        memory instead of decoding the file again. The view (zoom, scroll) is kept.
+        """
+        self.image_path = save_path
+        self._backup_original() # The saved file gets a backup like any opened image
+        self.config_path = f"{save_path}.yaml"
+        self.pipeline.stage_cache.forget()
+        self.history_results.forget() # Results of the previous original; the settings history stays valid
+        image.flags.writeable = False # Tools write into their own buffers, never the original
+        self.original_image_cv = image
+        self._pristine = (image, content_hash)
+        self.proxy_image_cv = self.proxy_processed_cv = None
+        self.update_gui()
 
     def load_tool_settings_dialog(self):
         iniFile = self.config_path or ((self.image_path + ".yaml") if self.image_path else "settings.yaml")
@@ -181,8 +624,19 @@ class AppController:
         )
         if file_path:
             # self.config_path = file_path
-            self.settings = self.config_manager.load(file_path)
+            settings = self.config_manager.load(file_path)
+            store = self._get_settings_store()
+            if store is not None and settings:
+                store.put_preset(settings_store.preset_name(file_path), settings)
+            if self.is_image_loaded():
+                # Loading a settings file is one undoable step
+                self._remember_result()
+                self.history.record(None, copy.deepcopy(self.settings), copy.deepcopy(settings))
+                self._update_history_menu()
+            self.settings = settings
             self.update_gui()  # Update the view with the loaded settings
+            # Compare against the settings as the tool widgets normalized them
+            self._preset = (settings_store.preset_name(file_path), copy.deepcopy(self.settings))
 
     def save_tool_settings(self, save_path=None):
         if not self.is_image_loaded():
@@ -192,10 +646,61 @@ class AppController:
         try:
             if save_path is None: save_path = self.config_path
             self.config_manager.save(save_path, self.settings)
+            self._store_tool_settings(save_path)
             messagebox.showinfo("Settings Saved", f"Settings saved to:\n{self.config_path}")
         except Exception as e:
             messagebox.showerror("Save Settings Error", f"Could not save settings: {e}")
 
+    def _store_tool_settings(self, save_path):
+        """Records saved tool settings in the settings store: as the image's settings, or as a preset file."""
+        store = self._get_settings_store()
+        if store is None:
+            return
+        settings = copy.deepcopy(self.settings)
+        if save_path == self.config_path:
+            entry = store.get_entry(self.image_path)
+            if entry is not None and entry[0] == settings:
+                # Unchanged settings: the image file is untouched, so what is known about the files they were
+                # applied to and produced still holds
+                content_hash, source_hash = entry[1], entry[3]
+            else:
+                content_hash, source_hash = None, self._source_digest()
+            store.put(self.image_path, settings, content_hash, self._current_preset(), source_hash)
+        else:
+            store.put_preset(settings_store.preset_name(save_path), settings)
+
+    # --- Settings store ---
+    def _get_settings_store(self):
+        """Returns the SettingsStore, opening it on first use, or None if it is disabled."""
+        if not self._settings_store_opened:
+            self._settings_store_opened = True
+            self._settings_store = settings_store.open_default()
+        return self._settings_store
+
+    def _load_stored_settings(self, image_path, digest):
+        """
+        Takes the last saved settings of an image from the settings store, but only if they were applied to exactly
+        this file (`digest` is its content hash). A file saved with the settings already contains them, and applying
+        them again would compound the effect.
+        """
+        store = self._get_settings_store()
+        entry = store.get_entry(image_path) if store is not None else None
+        if entry is None or digest is None or entry[3] != digest:
+            return
+        self.settings, _, preset, _ = entry
+        self._preset = (preset, copy.deepcopy(self.settings)) if preset else None
+
+    def _source_digest(self):
+        """Returns the content hash of the unprocessed image the current settings apply to, if known."""
+        image, digest = self._pristine
+        return digest if image is not None and image is self.original_image_cv else None
+
+    def _current_preset(self):
+        """Returns the name of the preset the current settings came from, or None if they have been changed since."""
+        if self._preset is not None and self._preset[1] == self.settings:
+            return self._preset[0]
+        return None
+
     def save_tool_settings_as_dialog(self):
         if self.is_image_loaded():
             iniFile = self.config_path or ((self.image_path + ".yaml") if self.image_path else "settings.yaml")
@@ -221,18 +726,86 @@ class AppController:
             if save_path: self.save_image(save_path)
 
     def reset_image(self):
-        if not self.backup_path or not os.path.exists(self.backup_path):
+        """
+        Goes back to the image's original with no tool settings. This happens in memory: the decoded original is
+        reused when the backup has the same content, so the reset costs one display refresh. The file on disk is
+        restored from the backup store afterwards, on the I/O thread, and its stored settings are cleared.
+        """
+        if self._backup_future is None:
             messagebox.showwarning("Reset Error", "No backup available.")
             return
         
-        assert isinstance(self.backup_path, str) and isinstance(self.image_path, str)
+        assert isinstance(self.image_path, str)
 
         try:
-            shutil.copy2(self.backup_path, self.image_path)
-            self.open_image(self.image_path)
-            messagebox.showinfo("Image Reset", "Image has been reset.")
+            digest = self._backup_future.result() # Normally finished long ago
+            original = self._original_snapshot(digest)
         except Exception as e:
             messagebox.showerror("Reset Error", f"Could not reset: {e}")
+            return
+
+        if original is not self.original_image_cv:
+            self.original_image_cv = original
+            self.pipeline.stage_cache.forget()
+            self.proxy_image_cv = self.proxy_processed_cv = None
+        self._clear_history()
+        self.settings = {}
+        self._preset = None
+
+        # No settings means no stages, so the original is the result; nothing needs to be rendered
+        self._generation += 1 # Anything in flight is for the old settings
+        self._cancel_pending_render()
+        self._settings_changed()
+        self.processed_image_cv = self.original_image_cv
+        self._full_res_stale = False
+        self.pyramid.set_base(None)
+        self._display_pil = (None, None)
+        self.update_view()
+        if self.view:
+            self.view.update_status_bar(self.image_path, self.config_path)
+            self._load_tool_widgets()
+
+        self._get_settings_store() # Opened here on the Tk thread, before the I/O thread uses it
+        future = self._io_executor.submit(self._restore_worker, self.image_path)
+        self._when_done(future, self._finish_reset)
+
+    def _original_snapshot(self, digest):
+        """Returns the decoded image with the given content hash: the pristine original if it matches, else the backup."""
+        image, pristine_digest = self._pristine
+        if image is not None and pristine_digest == digest:
+            return image
+        # The image had been edited before it was first opened (e.g. a legacy .bak exists); decode the backup,
+        # through the decoded image cache
+        image = self.processor.load(self.backup_store.object_path(digest))
+        image.flags.writeable = False
+        self._pristine = (image, digest)
+        return image
+
+    def _restore_worker(self, image_path):
+        """Runs on the I/O thread: writes the original back over the image file."""
+        digest = self.backup_store.restore(image_path)
+        if self.processor.cache is not None:
+            # The restored file has known content, so reopening it maps the cached decode without hashing it
+            self.processor.cache.remember_file(image_path, digest)
+        store = self._get_settings_store()
+        if store is not None:
+            # The stored settings were applied to this very content, so reopening the restored file would apply
+            # them again; record that it has none instead
+            store.put(image_path, {}, digest, None, digest)
+        return digest
+
+    def _finish_reset(self, future):
+        error = future.exception()
+        if error is not None:
+            messagebox.showerror("Reset Error", f"Could not restore the original file: {error}")
+        else:
+            messagebox.showinfo("Image Reset", "Image has been reset.")
+
+    def _file_digest(self, path):
+        """Returns the content hash of a file, from the decoded image cache's index when it is known there."""
+        if self.processor.cache is not None:
+            return self.processor.cache.file_digest(path)[0]
+        return app_cache.content_hash(path)
 
     # --- View Control Methods ---
     def set_display_mode(self, mode):
@@ -257,6 +830,25 @@ class AppController:
         self.zoom_level /= 1.25
         self.update_view()
 
+    # --- Instrumentation ---
+    def set_tracing(self, enabled):
+        """Turns per-stage timing on or off (see profiling.py)."""
+        tracer.enabled = enabled
+        if not enabled and self.view:
+            self.view.update_perf_status("")
+
+    def export_trace_dialog(self):
+        save_path = filedialog.asksaveasfilename(
+            title="Export Timing Trace", defaultextension=".json",
+            initialfile="rwr_tweak_trace.json",
+            filetypes=(("Chrome trace JSON", "*.json"),)
+        )
+        if save_path:
+            try:
+                tracer.export_chrome_trace(save_path)
+            except Exception as e:
+                messagebox.showerror("Export Error", f"Could not export trace: {e}")
+
     def is_image_loaded(self):
         return self.original_image_cv is not None
 
@@ -264,49 +856,61 @@ class AppController:
         return os.path.basename(self.image_path) if self.image_path else "untitled.png"
     
     def _backup_original(self):
+        """Stores the original of the current image in the backup store (on the I/O thread), unless it already is."""
+        self._backup_future = None
         if self.image_path and os.path.exists(self.image_path):
-            self.backup_path = f"{self.image_path}.bak"
-            if not os.path.exists(self.backup_path):
-                try: shutil.copy2(self.image_path, self.backup_path)
-                except Exception as e: messagebox.showerror("Backup Error", f"Could not create backup: {e}")
+            self._backup_future = self._io_executor.submit(self.backup_store.backup, self.image_path)
+            self._when_done(self._backup_future, self._report_backup)
+
+    def _report_backup(self, future):
+        error = future.exception()
+        if error is not None:
+            messagebox.showerror("Backup Error", f"Could not create backup: {error}")
     
     def _clear_image_context(self):
-        self.image_path = self.backup_path = self.config_path = None
+        self.image_path = self.config_path = None
+        self._backup_future = None
         self.original_image_cv = self.processed_image_cv = None
+        self._pristine = (None, None)
+        self.pyramid.set_base(None)
+        self._display_pil = (None, None)
+        self.pipeline.stage_cache.forget()
+        self.frame_buffers.release()
+        self.proxy_buffers.release()
+        self._generation += 1 # Discard anything still in flight
+        self._cancel_pending_render()
+        self.proxy_image_cv = self.proxy_processed_cv = None
+        self._full_res_stale = False
         self.settings = {}
+        self._clear_history()
         if self.view:
             self.view.update_display(None)
             self.view.update_status_bar(None, None) # new
             self.view.load_tool_settings({})
     
+    def shutdown(self):
+        """
+        Call when the application exits: waits for background saves and resets to finish, then writes the decoded
+        image cache's index, which would otherwise lose file digests recorded since its last write.
+        """
+        self._io_executor.shutdown(wait=True)
+        if self.processor.cache is not None:
+            self.processor.cache.flush()
+
     def load_tools(self, parent_frame):
         """
-        Dynamically discovers and loads all tool plugins from the 'tools' directory.
+        Dynamically discovers and loads all tool plugins from the 'tools' directory, and builds their panels.
+        Returns the panels (tool name -> ToolPanel); the tools themselves are kept in available_tools.
         """
-        self.available_tools = {}
-        # Discover modules in the 'tools' package
-        discovered_plugins = {
-            name: importlib.import_module(name)
-            for finder, name, ispkg
-            in pkgutil.iter_modules(tools.__path__, tools.__name__ + ".")
-        }
-
-        for name, module in discovered_plugins.items():
-            # Find classes within the module
-            for i in inspect.getmembers(module, inspect.isclass):
-                class_obj = i[1]
-                # Check if it's a subclass of BaseTool and not BaseTool itself
-                if issubclass(class_obj, BaseTool) and class_obj is not BaseTool:
-                    # The key for the tool will be the module name minus "_tool"
-                    tool_key = module.__name__.split('.')[-1].replace("_tool", "")
-                    # Instantiate the tool
-                    tool_instance = class_obj()
-                    self.available_tools[tool_key] = tool_instance
-                    print(f"Dynamically loaded tool: '{tool_key}'")
+        self.available_tools = tools.discover_tools()
+        for tool_key in self.available_tools:
+            print(f"Dynamically loaded tool: '{tool_key}'")
         
         # Now create the GUI for the discovered tools
         # A more advanced version might sort tools by a 'priority' attribute
+        panels = {}
         for tool_name, tool_instance in self.available_tools.items():
-            tool_instance.create_gui(parent_frame, self)
+            panels[tool_name] = tool_instance.create_panel(self)
+            panels[tool_name].create_gui(parent_frame)
         
-        return self.available_tools
\ No newline at end of file
+        return panels
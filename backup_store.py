@@ -0,0 +1,153 @@
+"""
+backup_store.py
+
+This module provides the BackupStore class, which keeps the original version of every image the editor has opened,
+so "Reset to Original" can restore it. Originals are stored once per distinct content in a per-user directory
+(see app_cache.py), named by their SHA-256 hash, instead of as a .bak copy beside every texture. Identical originals
+(e.g. the same texture in several packages) share one stored file.
+
+Usage:
+- The AppController calls backup(path) when an image is opened and restore(path) to reset it. Both do file I/O and
+  are meant to run on a background thread; the controller runs them on its I/O thread, in order with saves.
+- An image is only backed up the first time it is seen, so later (edited) versions never replace its original.
+  A legacy "<image>.bak" file, if present, is taken as the original.
+- New originals are stored as a reflink (copy-on-write clone) where the filesystem supports it, else as a regular
+  copy. Never as a hardlink: a stored original must not share its data with the live file, which the game or another
+  tool may rewrite in place. Every stored file is still checked against its hash before it is restored.
+- The index (image path -> hash) is a small JSON file next to the stored originals.
+
+Dependencies:
+- Standard Python modules: os, sys, json, shutil, tempfile, threading, fcntl (Linux, optional).
+- app_cache for the store location and content hashing.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import app_cache
+
+INDEX_NAME = "index.json"
+# ioctl request number of FICLONE on Linux (clone a whole file, copy-on-write)
+FICLONE = 0x40049409
+
+
+def _normalize(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _reflink(source, destination):
+    """Clones source into destination, sharing its data blocks. Raises OSError if the filesystem can't."""
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflinks are only supported on Linux")
+    import fcntl
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+class BackupStore:
+    """
+    A content-addressed store of image originals, indexed by image path.
+    """
+    def __init__(self, root=None):
+        self.root = root or app_cache.cache_dir("backups")
+        self._index_path = os.path.join(self.root, INDEX_NAME)
+        self._index = None # normalized image path -> hash, loaded on first use
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        fd, temp_path = tempfile.mkstemp(prefix=".index.", suffix=".tmp", dir=self.root)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self._index_path)
+
+    def object_path(self, digest):
+        """Returns where the original with the given hash is (or would be) stored."""
+        return os.path.join(self.root, digest[:2], digest)
+
+    def backup_hash(self, path):
+        """Returns the hash of the stored original of `path`, or None if it has none."""
+        with self._lock:
+            digest = self._load_index().get(_normalize(path))
+        if digest and os.path.exists(self.object_path(digest)):
+            return digest
+        return None
+
+    def backup(self, path):
+        """
+        Stores the original of `path` if it has none yet. Returns its hash.
+
+        A legacy "<path>.bak" is used as the original when present, since `path` itself may already be edited.
+        """
+        digest = self.backup_hash(path)
+        if digest is not None:
+            return digest
+
+        legacy_backup = f"{path}.bak"
+        source = legacy_backup if os.path.exists(legacy_backup) else path
+        digest = app_cache.content_hash(source)
+        self._store(source, digest)
+        with self._lock:
+            self._load_index()[_normalize(path)] = digest
+            self._save_index()
+        return digest
+
+    def _store(self, source, digest):
+        """Puts the contents of source into the store under its hash, unless an identical original is already there."""
+        destination = self.object_path(digest)
+        if os.path.exists(destination):
+            return # Deduplicated
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        temp_path = f"{destination}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            try:
+                _reflink(source, temp_path)
+            except OSError:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                shutil.copy2(source, temp_path)
+            os.replace(temp_path, destination)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def restore(self, path):
+        """
+        Writes the stored original of `path` back over it (atomically). Returns the original's hash.
+
+        :raises FileNotFoundError: If `path` has no stored original.
+        :raises ValueError: If the stored file no longer matches its hash.
+        """
+        digest = self.backup_hash(path)
+        if digest is None:
+            raise FileNotFoundError(f"No backup available for {path}")
+        stored = self.object_path(digest)
+        if app_cache.content_hash(stored) != digest:
+            raise ValueError(f"The backup of {path} has been modified since it was stored")
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+        os.close(fd)
+        try:
+            shutil.copyfile(stored, temp_path)
+            if os.path.exists(path):
+                os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return digest
@@ -0,0 +1,263 @@
+"""
+batch.py
+
+Headless batch entry point for the RWR Tweak Image Editor.
+
+This script applies one tool settings file (the YAML format written by ConfigManager / "Save Tool Settings") to many
+PNG images at once, using the same tool chain as the GUI. Images are processed in parallel with a process pool sized
+to the number of CPU cores. It never imports tkinter, so it can run on build machines without a display.
+
+Usage:
+    python batch.py settings.yaml textures/ extra/los.png -o out/
+    python batch.py settings.yaml textures/ --in-place --jobs 4
+    python batch.py dark_los textures/ --in-place              # a preset from the settings store
+    python batch.py settings.yaml textures/ -o out/ --stored   # each image's own stored settings where it has any
+
+- Inputs can be PNG files or directories (all *.png files inside; use --recursive to include subdirectories).
+- Images are processed in bands of rows (--band-height) straight back into the decoded image, so memory use stays
+  close to one decoded image per worker. Each worker process runs the bands of its image on --threads threads;
+  by default the CPU cores are shared out between the processes, so a few large images still use every core.
+- Results are written to the output directory (keeping paths relative to an input directory), or over the inputs
+  with --in-place. A copy of the settings is written next to each result, as the GUI's Save does.
+- Before anything is written, every existing file that would be overwritten (with --in-place, every input) is stored
+  in the backup store (backup_store.py), which the editor's "Reset to Original" restores from; if any backup fails,
+  nothing is written. --no-backup skips this.
+- A settings argument that is neither a settings file nor a stored preset, or that holds no tool settings, is an
+  error: the batch stops with exit status 1 before any file is written.
+- With the settings store (settings_store.py) enabled, the settings argument may also name a stored preset, --stored
+  looks up every input's own settings in one query, and every result is recorded in the store under the preset
+  name, with its content hash. --no-settings-store skips the store entirely.
+- --stored only applies stored settings to the unprocessed file they were saved for (the store's source hash). An
+  input that no longer has that content, such as the result of an earlier in-place run, already contains them, and
+  is skipped with a warning rather than processed again.
+
+Dependencies:
+- OpenCV (cv2), NumPy, PyYAML, and custom modules: image_processor, config_manager, pipeline, tools, settings_store,
+  app_cache, backup_store.
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import app_cache
+from backup_store import BackupStore
+from config_manager import ConfigManager
+from image_processor import ImageProcessor
+from pipeline import ToolPipeline, build_stages
+import settings_store
+import tools
+
+# Per-process state, created once per worker by _init_worker
+_worker = {}
+
+
+def collect_inputs(paths, output_dir=None, recursive=False):
+    """
+    Expands the given files and directories into a list of (input_path, output_path) pairs.
+    With no output_dir, each output path is the input path itself (in-place).
+    """
+    jobs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                if not recursive:
+                    dirnames[:] = []
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(".png"):
+                        input_path = os.path.join(dirpath, filename)
+                        relative = os.path.relpath(input_path, path)
+                        jobs.append((input_path, os.path.join(output_dir, relative) if output_dir else input_path))
+        elif os.path.isfile(path):
+            jobs.append((path, os.path.join(output_dir, os.path.basename(path)) if output_dir else path))
+        else:
+            print(f"Warning: '{path}' not found, skipping.")
+    return jobs
+
+
+def _init_worker(settings, band_height, threads):
+    _worker['settings'] = settings
+    _worker['tools'] = tools.discover_tools()
+    _worker['processor'] = ImageProcessor()
+    # Every image is processed once, so there is nothing worth caching between stages
+    _worker['pipeline'] = ToolPipeline(cache_bytes=0, band_height=band_height, workers=threads)
+
+
+def process_file(input_path, output_path, settings=None):
+    """
+    Runs the tool chain over one image and writes the result (plus its settings sidecar).
+    Uses the batch settings unless `settings` is given.
+    Returns (output_path, content hash of the written file, content hash of the input).
+    """
+    if settings is None:
+        settings = _worker['settings']
+    source_hash = app_cache.content_hash(input_path) # Before an in-place save replaces it
+    image = _worker['processor'].load(input_path)
+    # Stream the bands back into the decoded image, so no second full-size buffer is needed
+    result = _worker['pipeline'].run_streaming(image, build_stages(_worker['tools'], settings), out=image)
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    content_hash = _worker['processor'].save(output_path, result)
+    ConfigManager().save(f"{output_path}.yaml", settings)
+    return output_path, content_hash, source_hash
+
+
+def load_batch_settings(settings, store=None):
+    """
+    Returns (settings, preset name) for the settings argument: a YAML settings file, or the name of a preset in
+    the settings store. The file is registered as a preset in the store.
+
+    :raises ValueError: If there is no such settings file or preset, or it holds no tool settings.
+    """
+    if os.path.isfile(settings):
+        loaded = ConfigManager().load(settings)
+        if not loaded:
+            raise ValueError(f"No tool settings found in '{settings}'.")
+        if store is not None:
+            store.put_preset(settings_store.preset_name(settings), loaded)
+        return loaded, settings_store.preset_name(settings)
+    preset = store.get_preset(settings) if store is not None else None
+    if not preset:
+        if store is None:
+            raise ValueError(f"Settings file '{settings}' not found.")
+        raise ValueError(f"'{settings}' is neither a settings file nor a stored preset.")
+    return preset, settings
+
+
+def stored_settings(store, input_paths):
+    """
+    Looks up the stored settings of every input in one indexed query, instead of looking for sidecar files.
+    Settings are only used for the unprocessed file they were applied to (the row's source_hash): a file saved with
+    them already contains them, and processing it again would compound the effect.
+    Returns ({input path: settings}, set of inputs that have stored settings but are not their source).
+    """
+    stored = {}
+    already_processed = set()
+    for input_path, (settings, source_hash) in store.get_many(input_paths).items():
+        if source_hash is not None and app_cache.content_hash(input_path) == source_hash:
+            stored[input_path] = settings
+        else:
+            already_processed.add(input_path)
+    return stored, already_processed
+
+
+def backup_originals(paths):
+    """
+    Stores the originals of the given images in the backup store, unless they already have one.
+
+    :raises ValueError: If any image could not be backed up.
+    """
+    backup_store = BackupStore()
+    for path in paths:
+        try:
+            backup_store.backup(path)
+        except OSError as e:
+            raise ValueError(f"Could not back up '{path}': {e}") from e
+    print(f"Originals of {len(paths)} images are in the backup store ({backup_store.root}).")
+
+
+def run_batch(settings_path, inputs, output_dir=None, jobs=None, recursive=False,
+              band_height=ToolPipeline.DEFAULT_BAND_HEIGHT, use_store=True, use_stored_settings=False, threads=None,
+              backup=True):
+    """
+    Applies the settings file (or stored preset) to all inputs in parallel.
+
+    :param threads: Band threads per worker process (default: the CPU cores divided among the processes).
+    :param use_store: Use the settings store (presets, --stored lookups, recording results).
+    :param use_stored_settings: Process each input with its own stored settings where it has any.
+    :param backup: Store the original of every input that is overwritten in the backup store first.
+    :return: The number of images that failed.
+    :raises ValueError: If the settings can't be loaded or the backups fail; no file has been written then.
+    """
+    store = settings_store.open_default() if use_store else None
+    settings, preset = load_batch_settings(settings_path, store)
+
+    work = collect_inputs(inputs, output_dir, recursive)
+    if not work:
+        print("No PNG images to process.")
+        return 0
+
+    stored = {}
+    if store and use_stored_settings:
+        stored, already_processed = stored_settings(store, [input_path for input_path, _ in work])
+        for input_path in already_processed:
+            print(f"Warning: '{input_path}' is not the unprocessed image its stored settings apply to, skipping.",
+                  file=sys.stderr)
+        work = [(input_path, output_path) for input_path, output_path in work if input_path not in already_processed]
+        if not work:
+            print("No images left to process.")
+            return 0
+
+    overwritten = [output_path for _, output_path in work if os.path.exists(output_path)]
+    if backup and overwritten:
+        backup_originals(overwritten)
+
+    jobs = min(jobs or os.cpu_count() or 1, len(work))
+    threads = threads or max(1, (os.cpu_count() or 1) // jobs)
+    failures = 0
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(settings, band_height, threads)) as pool:
+        futures = {pool.submit(process_file, input_path, output_path, stored.get(input_path)):
+                   (input_path, output_path) for input_path, output_path in work}
+        for future in as_completed(futures):
+            input_path, output_path = futures[future]
+            try:
+                _, content_hash, source_hash = future.result()
+                print(f"Wrote {output_path}")
+                own = stored.get(input_path)
+                results.append((output_path, own if own is not None else settings, content_hash,
+                                None if own is not None else preset, source_hash))
+            except Exception as e:
+                failures += 1
+                print(f"Error processing '{input_path}': {e}", file=sys.stderr)
+
+    if store is not None:
+        store.put_many(results)
+    print(f"Processed {len(work) - failures} of {len(work)} images.")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply RWR Tweak tool settings to many PNG images without the GUI.")
+    parser.add_argument("settings", help="Tool settings YAML file (as saved by the editor), or a stored preset name.")
+    parser.add_argument("inputs", nargs="+", help="PNG files or directories containing PNG files.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("-o", "--output-dir", help="Directory to write the processed images to.")
+    target.add_argument("--in-place", action="store_true", help="Overwrite the input images.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes (default: CPU count).")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Include PNG files in subdirectories.")
+    parser.add_argument("--band-height", type=int, default=ToolPipeline.DEFAULT_BAND_HEIGHT,
+                        help="Rows processed per band (default: %(default)s). Smaller bands use less memory.")
+    parser.add_argument("-t", "--threads", type=int, default=None,
+                        help="Threads per worker process for processing bands (default: CPU count / processes).")
+    parser.add_argument("--stored", action="store_true",
+                        help="Use each image's own settings from the settings store where it has any.")
+    parser.add_argument("--no-settings-store", action="store_true",
+                        help="Neither read from nor record results in the settings store.")
+    parser.add_argument("--no-backup", action="store_true",
+                        help="Overwrite images without storing their originals in the backup store first.")
+    args = parser.parse_args(argv)
+    if args.band_height < 1:
+        parser.error("--band-height must be at least 1")
+    if args.threads is not None and args.threads < 1:
+        parser.error("--threads must be at least 1")
+
+    if args.stored and args.no_settings_store:
+        parser.error("--stored needs the settings store")
+
+    try:
+        failures = run_batch(args.settings, args.inputs, args.output_dir, args.jobs, args.recursive, args.band_height,
+                             use_store=not args.no_settings_store, use_stored_settings=args.stored,
+                             threads=args.threads, backup=not args.no_backup)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
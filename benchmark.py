@@ -0,0 +1,197 @@
+"""
+benchmark.py
+
+Performance benchmarks for the RWR Tweak Image Editor's hot paths.
+
+This script generates synthetic BGRA images at several sizes (including los.png-like soft radial alpha masks) and times:
+- TransparencyTool.apply and ColorTool.apply across a range of settings.
+- AppController._apply_all_tool_effects with different tool combinations (stage cache cleared for every run).
+- AppController._convert_cv_to_pil.
+- The resize + checkerboard composite done by MainWindow.update_display, for the fit view and for one zoomed tile,
+  using the Tk-free helpers in gui.compositing (no window is created).
+
+Usage:
+    python benchmark.py                               # print results
+    python benchmark.py -o baseline.json              # store results as JSON
+    python benchmark.py --compare baseline.json       # fail (exit code 1) on regressions against a stored run
+
+Results are machine-readable JSON: {"meta": {...}, "results": {name: {"median_ms", "min_ms", "repeats"}}}.
+
+Dependencies:
+- OpenCV (cv2), NumPy, Pillow, and the application modules (tkinter is imported by app_controller but never started).
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app_controller import AppController
+from gui.compositing import composite_on_checkerboard, render_region
+from tools.color_tool import ColorTool
+from tools.transparency_tool import TransparencyTool
+
+DEFAULT_SIZES = (512, 2048, 4096)
+
+TRANSPARENCY_SETTINGS = {
+    'fade_out': {'enabled': True, 'alpha': -50.0, 'falloff': 1.0, 'alpha_offset': 0.0},
+    'fade_in': {'enabled': True, 'alpha': 60.0, 'falloff': 0.5, 'alpha_offset': 0.0},
+    'fade_in_offset': {'enabled': True, 'alpha': 60.0, 'falloff': 1.5, 'alpha_offset': 40.0},
+}
+COLOR_SETTINGS = {
+    'red': {'enabled': True, 'hue': 0, 'saturation': 100.0, 'value': 255.0},
+    'teal': {'enabled': True, 'hue': 45, 'saturation': 60.0, 'value': 127.0},
+}
+TOOL_COMBINATIONS = {
+    'none': {},
+    'transparency': {'transparency': TRANSPARENCY_SETTINGS['fade_in_offset']},
+    'color': {'color': COLOR_SETTINGS['teal']},
+    'transparency+color': {'transparency': TRANSPARENCY_SETTINGS['fade_in_offset'], 'color': COLOR_SETTINGS['teal']},
+}
+# Canvas size used for the display benchmarks
+CANVAS_SIZE = (1280, 800)
+
+
+def make_los_image(size, seed=0):
+    """Returns a square BGRA image with noisy color and a soft radial alpha mask, like the game's los.png."""
+    rng = np.random.default_rng(seed)
+    coords = np.linspace(-1.0, 1.0, size, dtype=np.float32)
+    radius = np.sqrt(coords[None, :] ** 2 + coords[:, None] ** 2)
+    alpha = np.clip(1.0 - radius, 0.0, 1.0) ** 1.5 * 230.0
+    image = np.empty((size, size, 4), dtype=np.uint8)
+    image[:, :, :3] = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    image[:, :, 3] = alpha.astype(np.uint8)
+    return image
+
+
+def time_call(func, repeats):
+    """Runs func once to warm up, then `repeats` times. Returns timings in milliseconds."""
+    func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeats=5, name_filter=None):
+    """Runs every benchmark and returns {name: {"median_ms", "min_ms", "repeats"}}."""
+    results = {}
+
+    def record(name, func):
+        if name_filter and name_filter not in name:
+            return
+        timings = time_call(func, repeats)
+        results[name] = {
+            'median_ms': round(statistics.median(timings), 3),
+            'min_ms': round(min(timings), 3),
+            'repeats': repeats,
+        }
+        print(f"{name:<55} {results[name]['median_ms']:>10.2f} ms")
+
+    transparency = TransparencyTool()
+    color = ColorTool()
+
+    for size in sizes:
+        image = make_los_image(size)
+        image.flags.writeable = False
+
+        for label, settings in TRANSPARENCY_SETTINGS.items():
+            record(f"tool.transparency.{label}@{size}", lambda: transparency.apply(image, settings))
+        for label, settings in COLOR_SETTINGS.items():
+            record(f"tool.color.{label}@{size}", lambda: color.apply(image, settings))
+
+        controller = AppController()
+        controller.available_tools = {'transparency': transparency, 'color': color}
+        controller.original_image_cv = image
+        for label, settings in TOOL_COMBINATIONS.items():
+            def run_pipeline(settings=settings):
+                controller.pipeline.stage_cache.forget()
+                controller.settings = settings
+                controller._apply_all_tool_effects()
+            record(f"pipeline.{label}@{size}", run_pipeline)
+
+        record(f"display.convert_cv_to_pil@{size}", lambda: controller._convert_cv_to_pil(image))
+
+        pil_image = controller._convert_cv_to_pil(image)
+        canvas_w, canvas_h = CANVAS_SIZE
+        scale = min(canvas_w / size, canvas_h / size)
+        fit_size = (int(size * scale), int(size * scale))
+        record(f"display.fit_resize_composite@{size}",
+               lambda: composite_on_checkerboard(pil_image.resize(fit_size, Image.Resampling.LANCZOS)))
+        # One 320px tile at 400% zoom, the unit of work when panning a zoomed view
+        record(f"display.zoom_tile_400pct@{size}", lambda: render_region(pil_image, (0, 0, 80, 80), (320, 320)))
+
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms=0.5):
+    """
+    Prints a comparison against a baseline run. Returns the names of benchmarks that regressed:
+    slower by more than `threshold` times and by more than `min_delta_ms` (to ignore timer noise).
+    """
+    regressions = []
+    print(f"\n{'benchmark':<55} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<55} {'-':>10} {result['median_ms']:>10.2f} {'new':>7}")
+            continue
+        ratio = result['median_ms'] / base['median_ms'] if base['median_ms'] else float('inf')
+        flag = ""
+        if ratio > threshold and result['median_ms'] - base['median_ms'] > min_delta_ms:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<55} {base['median_ms']:>10.2f} {result['median_ms']:>10.2f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the RWR Tweak tools, pipeline and display paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Square image sizes to test.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per benchmark (default: %(default)s).")
+    parser.add_argument("-k", "--filter", help="Only run benchmarks whose name contains this text.")
+    parser.add_argument("-o", "--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a JSON file written with --output.")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Slowdown ratio that counts as a regression in --compare mode (default: %(default)s).")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="Ignore slowdowns smaller than this many milliseconds (default: %(default)s).")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeats, args.filter)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.2f}x.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
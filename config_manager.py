@@ -17,9 +17,12 @@ Dependencies:
 Intended for use as a utility within the application's controller to manage user and tool configuration data.
 """
 
-import yaml
 import os
 
+from lazy_import import lazy_import
+
+yaml = lazy_import("yaml")
+
 class ConfigManager:
     """
     Manages loading and saving of image modification settings to a YAML file.
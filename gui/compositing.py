@@ -0,0 +1,42 @@
+# gui/compositing.py
+# Tk-free helpers for compositing images over the checkered transparency background.
+from __future__ import annotations
+
+from functools import lru_cache
+
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+
+CHECKER_TILE_SIZE = 20
+CHECKER_COLORS = ((204, 204, 204), (217, 217, 217))
+
+
+@lru_cache(maxsize=8)
+def checkerboard(width: int, height: int) -> Image.Image:
+    """
+    Returns an opaque RGBA checkerboard of the given size.
+    Generated with array ops and cached per size, so display refreshes reuse it.
+    """
+    rows = np.arange(height) // CHECKER_TILE_SIZE
+    cols = np.arange(width) // CHECKER_TILE_SIZE
+    parity = (rows[:, None] + cols[None, :]) & 1
+    palette = np.array([color + (255,) for color in CHECKER_COLORS], dtype=np.uint8)
+    return Image.fromarray(palette[parity], "RGBA")
+
+
+def composite_on_checkerboard(image: Image.Image) -> Image.Image:
+    """Composites an image over the cached checkerboard of the same size."""
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    return Image.alpha_composite(checkerboard(*image.size), image)
+
+
+def render_region(image: Image.Image, box, size) -> Image.Image:
+    """
+    Resamples the `box` region (in source pixels, fractional allowed) of an image to `size`
+    and composites it over the checkerboard. Used to render one display tile at a time.
+    """
+    region = image.resize(size, Image.Resampling.LANCZOS, box=box)
+    return composite_on_checkerboard(region)
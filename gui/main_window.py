@@ -1,20 +1,36 @@
 # gui/main_window.py
 # Defines the main GUI layout and widgets for the Image Editor.
+from __future__ import annotations
 
-import os
+import queue
+import threading
+from collections import OrderedDict
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk # For displaying images
 import path_finder
+from lazy_import import lazy_import
+from profiling import tracer, startup_report
+from gui.compositing import CHECKER_COLORS, CHECKER_TILE_SIZE, composite_on_checkerboard, render_region
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from app_controller import AppController
 
+# Pillow is only needed once an image is shown, so it is not loaded before the window first appears
+Image = lazy_import("PIL.Image")
+ImageTk = lazy_import("PIL.ImageTk")
+
 
 class MainWindow:
     """
     Defines the main GUI layout and widgets, now with zoom and scroll functionality.
     """
+    # Display-space size of the tiles used when zoomed in (a multiple of the 40px checker period)
+    TILE_SIZE = 320
+    # Maximum number of rendered tiles kept for panning back and forth
+    TILE_CACHE_SIZE = 64
+    # How often (ms) to check whether the background Steam discovery has finished
+    DISCOVERY_POLL_MS = 100
+
     def __init__(self, root, controller: "AppController"):
         self.root = root
         self.controller = controller
@@ -53,15 +69,22 @@ class MainWindow:
         )
         self.image_canvas.grid(row=0, column=0, sticky='nsew')
         
-        self.v_scrollbar.config(command=self.image_canvas.yview)
-        self.h_scrollbar.config(command=self.image_canvas.xview)
+        self.v_scrollbar.config(command=self._on_yscroll)
+        self.h_scrollbar.config(command=self._on_xscroll)
         
         self.image_display_frame.grid_rowconfigure(0, weight=1)
         self.image_display_frame.grid_columnconfigure(0, weight=1)
         
         self.canvas_image_id = None
 
-        self.rwr_los_path = self.get_rwr_los_path()
+        # Zoomed views are rendered as tiles; only tiles in the visible region are resampled
+        self._tile_cache = OrderedDict() # (tx, ty) -> PhotoImage, most recently used last
+        self._reset_tiles()
+
+        # The RWR los.png is looked up on a background thread; its menu item is enabled once it is found
+        self.rwr_los_path = None
+        self._rwr_discovery = queue.Queue()
+        threading.Thread(target=self._discover_rwr_los, name="steam-discovery", daemon=True).start()
 
         # --- Checkered Background ---
         self.checkered_bg = None
@@ -92,13 +115,31 @@ class MainWindow:
         # config_path_label.pack(side=tk.LEFT, padx=(10,5), fill=tk.X, expand=True)
         config_path_label.pack(side=tk.TOP, padx=(5,5), fill=tk.X, anchor='w', pady=(0,2)) # new end
 
+        # Rolling timing stats, only filled in while tracing is enabled
+        self.perf_var = tk.StringVar(value="")
+        perf_label = ttk.Label(self.status_bar_frame, textvariable=self.perf_var, anchor='w')
+        perf_label.pack(side=tk.TOP, padx=(5,5), fill=tk.X, anchor='w')
+
         # --- Tools Panel ---
         self.tools_frame = ttk.Frame(main_pane, width=280, relief=tk.RAISED)
         main_pane.add(self.tools_frame, weight=1)
         tk.Label(self.tools_frame, text="Tools Panel", bg="lightgray", font=("Arial", 12, "bold"), relief=tk.GROOVE).pack(pady=10, fill=tk.X, padx=5)
 
         self.create_menu()
-        self.tools = self.controller.load_tools(self.tools_frame)
+        self.root.after(self.DISCOVERY_POLL_MS, self._poll_rwr_discovery)
+
+        # Tool panels are built once the empty window has been drawn, so it appears without waiting for them
+        self.tool_panels = {}
+        self.root.after_idle(lambda: self.root.after(0, self._build_tool_panels))
+
+    def _build_tool_panels(self):
+        startup_report.phase("first frame")
+        self.tool_panels = self.controller.load_tools(self.tools_frame)
+        if self.controller.is_image_loaded():
+            # An image was opened before the panels existed
+            self.load_tool_settings(self.controller.settings)
+        startup_report.phase("tool panels")
+        startup_report.finish()
 
     def _draw_checkered_background(self, event=None):
         """Draws a checkered background on the canvas."""
@@ -107,21 +148,16 @@ class MainWindow:
         width = self.image_canvas.winfo_width()
         height = self.image_canvas.winfo_height()
         
-        # Create a small tile
-        tile_size = 20
-        # c1, c2 = "gray80", "gray85"
-        c1, c2 = (204, 204, 204), (217, 217, 217)  # Use RGB tuples instead of color names
-        tile_pil = Image.new("RGB", (tile_size * 2, tile_size * 2))
-        
-        # Simple drawing of a 2x2 checker pattern
-        for i in range(2):
-            for j in range(2):
-                color = c1 if (i + j) % 2 == 0 else c2
-                # Create a rectangle of the color
-                img_rect = Image.new("RGB", (tile_size, tile_size), color)
-                tile_pil.paste(img_rect, (i * tile_size, j * tile_size))
+        if self.checkered_bg is None:
+            # Create a small tile (a plain Tk image, so the empty window doesn't need Pillow)
+            tile_size = CHECKER_TILE_SIZE
+            self.checkered_bg = tk.PhotoImage(width=tile_size * 2, height=tile_size * 2)
 
-        self.checkered_bg = ImageTk.PhotoImage(tile_pil)
+            # Simple drawing of a 2x2 checker pattern
+            for i in range(2):
+                for j in range(2):
+                    color = "#%02x%02x%02x" % CHECKER_COLORS[(i + j) % 2]
+                    self.checkered_bg.put(color, to=(i * tile_size, j * tile_size, (i + 1) * tile_size, (j + 1) * tile_size))
 
         # Tile the background
         for y in range(0, height, self.checkered_bg.height()):
@@ -136,7 +172,9 @@ class MainWindow:
         self._draw_checkered_background(event)
 
         if self.controller.display_mode == 'fit' and self.controller.is_image_loaded():
-            self.update_display()
+            self.controller.update_view()
+        elif self._tile_source is not None:
+            self._render_visible_tiles()
         else:
             # Keep text centered
             if self.canvas_image_id is None and self.initial_text_id:
@@ -151,7 +189,7 @@ class MainWindow:
         self.file_menu = tk.Menu(self.menubar, tearoff=0)
         self.menubar.add_cascade(label="File", menu=self.file_menu)
         self.file_menu.add_command(label="Open Image...", command=lambda: self.controller.open_image_dialog())
-        self.file_menu.add_command(label="Open RWR los.png", command=lambda: self.open_rwr_los(), state=tk.NORMAL if self.rwr_los_path else tk.DISABLED)
+        self.file_menu.add_command(label="Open RWR los.png", command=lambda: self.open_rwr_los(), state=tk.DISABLED)
         self.file_menu.add_command(label="Save", command=lambda: self.controller.save_image(), state=tk.DISABLED)
         self.file_menu.add_command(label="Save As...", command=lambda: self.controller.save_image_as_dialog(), state=tk.DISABLED)
         self.file_menu.add_separator()
@@ -163,6 +201,15 @@ class MainWindow:
         self.file_menu.add_separator()
         self.file_menu.add_command(label="Exit", command=self.root.quit)
         
+        # Edit Menu
+        self.edit_menu = tk.Menu(self.menubar, tearoff=0)
+        self.menubar.add_cascade(label="Edit", menu=self.edit_menu)
+        self.edit_menu.add_command(label="Undo", accelerator="Ctrl+Z", command=lambda: self.controller.undo(), state=tk.DISABLED)
+        self.edit_menu.add_command(label="Redo", accelerator="Ctrl+Y", command=lambda: self.controller.redo(), state=tk.DISABLED)
+        self.root.bind_all("<Control-z>", lambda e: self.controller.undo())
+        self.root.bind_all("<Control-y>", lambda e: self.controller.redo())
+        self.root.bind_all("<Control-Z>", lambda e: self.controller.redo()) # Ctrl+Shift+Z
+
         # View Menu (New)
         self.view_menu = tk.Menu(self.menubar, tearoff=0)
         self.menubar.add_cascade(label="View", menu=self.view_menu)
@@ -171,17 +218,39 @@ class MainWindow:
         self.view_menu.add_separator()
         self.view_menu.add_command(label="Fit to Window", command=lambda: self.controller.set_display_mode('fit'), state=tk.DISABLED)
         self.view_menu.add_command(label="Actual Size (100%)", command=lambda: self.controller.set_display_mode('actual'), state=tk.DISABLED)
+        self.view_menu.add_separator()
+        # Most refreshes per second while tool settings change; faster costs more processing per second of dragging
+        self.fps_var = tk.DoubleVar(value=self.controller.target_fps)
+        self.refresh_menu = tk.Menu(self.view_menu, tearoff=0)
+        for fps in (15, 30, 60):
+            self.refresh_menu.add_radiobutton(label=f"{fps} fps", variable=self.fps_var, value=fps, command=lambda: self.controller.set_target_fps(self.fps_var.get()))
+        self.view_menu.add_cascade(label="Refresh Rate", menu=self.refresh_menu)
+        self.trace_var = tk.BooleanVar(value=tracer.enabled)
+        self.view_menu.add_checkbutton(label="Trace Timing", variable=self.trace_var, command=lambda: self.controller.set_tracing(self.trace_var.get()))
+        self.view_menu.add_command(label="Export Trace...", command=lambda: self.controller.export_trace_dialog())
 
-    def update_display(self, pil_image_to_display:Image.Image | None=None):
+    def get_canvas_size(self):
+        """Returns the current (width, height) of the image canvas."""
+        return self.image_canvas.winfo_width(), self.image_canvas.winfo_height()
+
+    def update_display(self, pil_image_to_display:Image.Image | None=None, full_size=None):
         """
         Main function to update the canvas. It handles scaling, centering, and scroll region.
+
+        :param full_size: The (width, height) of the full-resolution image, if pil_image_to_display
+                          is a downscaled proxy. Scaling is computed against this size.
         """
+        with tracer.span("update_display"):
+            self._update_display(pil_image_to_display, full_size)
+
+    def _update_display(self, pil_image_to_display, full_size):
         if self.initial_text_id:
             self.image_canvas.delete(self.initial_text_id)
             self.initial_text_id = None
         
         if pil_image_to_display is None:
             self.image_canvas.delete("all")
+            self._reset_tiles()
             self.update_menu_states(image_loaded=False)
             return
 
@@ -189,7 +258,7 @@ class MainWindow:
         canvas_height = self.image_canvas.winfo_height()
         
         # --- Image Scaling Logic ---
-        img_w, img_h = pil_image_to_display.size
+        img_w, img_h = full_size or pil_image_to_display.size
         
         if self.controller.display_mode == 'fit':
             # Calculate scale factor to fit image in canvas
@@ -205,30 +274,30 @@ class MainWindow:
         # New dimensions for display
         new_w, new_h = int(img_w * scale), int(img_h * scale)
 
+        if self.controller.display_mode != 'fit':
+            # Zoomed views are rendered tile by tile, only where the canvas is showing them
+            with tracer.span("render_tiles"):
+                self._show_tiled(pil_image_to_display, new_w, new_h)
+            self.update_menu_states(image_loaded=True)
+            return
+
         # Use Pillow to resize the image for display. This does NOT affect the saved data.
         # Image.Resampling.LANCZOS is high quality, use NEAREST for pixel art if needed.
-        display_img = pil_image_to_display.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        with tracer.span("resize"):
+            display_img = pil_image_to_display.resize((new_w, new_h), Image.Resampling.LANCZOS)
 
         # --- Composite with checkered background ---
-        # Create a checkered background PIL image of the same size
-        tile_size = 20
-        c1, c2 = (204, 204, 204), (217, 217, 217)
-        bg = Image.new("RGBA", (new_w, new_h))
-        for y in range(0, new_h, tile_size):
-            for x in range(0, new_w, tile_size):
-                color = c1 if ((x // tile_size + y // tile_size) % 2 == 0) else c2
-                Image.Image.paste(bg, Image.new("RGBA", (tile_size, tile_size), color + (255,)), (x, y))
-        # Ensure display_img is RGBA
-        if display_img.mode != "RGBA":
-            display_img = display_img.convert("RGBA")
-        # Composite image over checkered background
-        composited_img = Image.alpha_composite(bg, display_img)
+        # The background is generated once per size and cached
+        with tracer.span("composite"):
+            composited_img = composite_on_checkerboard(display_img)
         
         # Convert to Tkinter-compatible format
-        self.tk_image = ImageTk.PhotoImage(composited_img)
+        with tracer.span("photoimage"):
+            self.tk_image = ImageTk.PhotoImage(composited_img)
         
         # --- Canvas Update Logic ---
         self.image_canvas.delete("all") # Clear previous image
+        self._reset_tiles()
         
         # Position the image on the canvas
         self.canvas_image_id = self.image_canvas.create_image(0, 0, anchor='nw', image=self.tk_image)
@@ -238,6 +307,71 @@ class MainWindow:
         
         self.update_menu_states(image_loaded=True)
 
+    # --- Tiled (zoomed) rendering ---
+    def _reset_tiles(self, source=None, size=(0, 0)):
+        """Forgets all rendered tiles, optionally switching to a new source image and display size."""
+        self._tile_source = source
+        self._tile_display_size = size
+        self._tile_cache.clear()
+        self._tile_items = {}
+
+    def _show_tiled(self, pil_image, display_w, display_h):
+        """Starts showing a new image (or zoom level) as tiles, rendering the visible ones right away."""
+        self.image_canvas.delete("all")
+        self.tk_image = None
+        self._reset_tiles(pil_image, (display_w, display_h))
+        self.canvas_image_id = "tile"
+        self.image_canvas.config(scrollregion=(0, 0, display_w, display_h))
+        self._render_visible_tiles()
+
+    def _render_visible_tiles(self):
+        """Renders the tiles intersecting the visible canvas region and drops canvas items for the rest."""
+        if self._tile_source is None:
+            return
+        display_w, display_h = self._tile_display_size
+        if display_w <= 0 or display_h <= 0:
+            return
+
+        left = max(0, int(self.image_canvas.canvasx(0)))
+        top = max(0, int(self.image_canvas.canvasy(0)))
+        right = min(display_w, left + self.image_canvas.winfo_width())
+        bottom = min(display_h, top + self.image_canvas.winfo_height())
+
+        tile = self.TILE_SIZE
+        visible = {
+            (tx, ty)
+            for ty in range(top // tile, (bottom - 1) // tile + 1)
+            for tx in range(left // tile, (right - 1) // tile + 1)
+        }
+
+        for key in [key for key in self._tile_items if key not in visible]:
+            self.image_canvas.delete(self._tile_items.pop(key))
+
+        # Source pixels per display pixel (the source may be a downscaled proxy or pyramid level)
+        src_w, src_h = self._tile_source.size
+        fx, fy = src_w / display_w, src_h / display_h
+        for tx, ty in sorted(visible - self._tile_items.keys()):
+            x0, y0 = tx * tile, ty * tile
+            x1, y1 = min(x0 + tile, display_w), min(y0 + tile, display_h)
+            photo = self._tile_cache.get((tx, ty))
+            if photo is None:
+                region = render_region(self._tile_source, (x0 * fx, y0 * fy, x1 * fx, y1 * fy), (x1 - x0, y1 - y0))
+                photo = ImageTk.PhotoImage(region)
+                self._tile_cache[(tx, ty)] = photo
+                while len(self._tile_cache) > self.TILE_CACHE_SIZE:
+                    self._tile_cache.popitem(last=False)
+            else:
+                self._tile_cache.move_to_end((tx, ty))
+            self._tile_items[(tx, ty)] = self.image_canvas.create_image(x0, y0, anchor='nw', image=photo, tags="tile")
+
+    def _on_xscroll(self, *args):
+        self.image_canvas.xview(*args)
+        self._render_visible_tiles()
+
+    def _on_yscroll(self, *args):
+        self.image_canvas.yview(*args)
+        self._render_visible_tiles()
+
     def update_menu_states(self, image_loaded):
         """Enable or disable menu items based on whether an image is loaded."""
         state = tk.NORMAL if image_loaded else tk.DISABLED
@@ -255,11 +389,20 @@ class MainWindow:
         self.view_menu.entryconfig("Fit to Window", state=state)
         self.view_menu.entryconfig("Actual Size (100%)", state=state)
     
+    def update_history_menu(self, can_undo, can_redo):
+        """Enables Undo/Redo according to the controller's history."""
+        self.edit_menu.entryconfig("Undo", state=tk.NORMAL if can_undo else tk.DISABLED)
+        self.edit_menu.entryconfig("Redo", state=tk.NORMAL if can_redo else tk.DISABLED)
+
     def load_tool_settings(self, settings):
         """Applies loaded settings to the relevant tool GUIs."""
-        for tool_name, tool_instance in self.tools.items():
-            tool_instance.set_settings(settings.get(tool_name, {}))
+        for tool_name, panel in self.tool_panels.items():
+            panel.set_settings(settings.get(tool_name, {}))
         
+    def update_perf_status(self, text):
+        """Shows the rolling timing summary in the status bar."""
+        self.perf_var.set(text)
+
     def update_status_bar(self, image_path: str | None, config_path: str | None): # new
         """Updates the labels in the status bar."""
         img_text = f"Image: {image_path}" if image_path else "Image: N/A"
@@ -267,22 +410,23 @@ class MainWindow:
         self.image_path_var.set(img_text)
         self.config_path_var.set(cfg_text)
 
-    def get_rwr_los_path(self):
-        """
-        Opens a file dialog to select the RWR LOS file.
-        """
-        rwr_path = path_finder.find_game_install_path()
-        if not rwr_path:
-            messagebox.showerror("Error", "RWR installation path not found.")
-            return None
-        
-        rwr_los_suffix = "media/packages/vanilla/textures/los.png"
-        rwr_los_path = os.path.join(rwr_path, rwr_los_suffix)
-        if not os.path.exists(rwr_los_path):
-            messagebox.showerror("Error", f"RWR LOS file not found at {rwr_los_path}.")
-            return None
-        
-        return rwr_los_path
+    def _discover_rwr_los(self):
+        """Runs on the discovery thread: looks up the RWR LOS file and hands the result to the Tk thread."""
+        try:
+            self._rwr_discovery.put(path_finder.find_rwr_los_path())
+        except Exception as e:
+            print(f"Steam discovery failed: {e}")
+            self._rwr_discovery.put(None)
+
+    def _poll_rwr_discovery(self):
+        """Enables "Open RWR los.png" once the background discovery has found the file."""
+        try:
+            self.rwr_los_path = self._rwr_discovery.get_nowait()
+        except queue.Empty:
+            self.root.after(self.DISCOVERY_POLL_MS, self._poll_rwr_discovery)
+            return
+        if self.rwr_los_path:
+            self.file_menu.entryconfig("Open RWR los.png", state=tk.NORMAL)
     
     def open_rwr_los(self):
         """
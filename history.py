@@ -0,0 +1,120 @@
+"""
+history.py
+
+This module provides the SettingsHistory class, the undo/redo history of the editor. It records compact settings
+deltas (which tool changed, its settings before and after) instead of images, so a long session costs a few bytes
+per step. Rendered results of recent history points are cached separately by the AppController.
+
+Usage:
+- The AppController calls record() for every tool change, undo()/redo() to step through the history, and clear()
+  when another image is opened.
+- Consecutive changes to the same tool are merged into one step: all changes made during one slider drag (same
+  merge key), or, without a merge key, changes that follow each other within merge_seconds.
+- The history keeps at most max_bytes of settings (measured as pickled size); the oldest steps are dropped first.
+
+Dependencies:
+- Standard Python modules: pickle, time, collections.
+"""
+
+import pickle
+import time
+from collections import deque
+
+
+class HistoryEntry:
+    """One undoable step: the settings of one tool (or of all tools, if key is None) before and after."""
+    __slots__ = ("key", "before", "after", "merge_key", "time", "nbytes")
+
+    def __init__(self, key, before, after, merge_key, timestamp):
+        self.key = key
+        self.before = before
+        self.after = after
+        self.merge_key = merge_key
+        self.time = timestamp
+        self.nbytes = self._measure()
+
+    def _measure(self):
+        return len(pickle.dumps((self.key, self.before, self.after), pickle.HIGHEST_PROTOCOL))
+
+
+class SettingsHistory:
+    """
+    A memory-bounded undo/redo history of settings deltas.
+    """
+    def __init__(self, max_bytes=1024 * 1024, merge_seconds=0.75):
+        self.max_bytes = max_bytes
+        self.merge_seconds = merge_seconds
+        self.current_bytes = 0
+        self._undo = deque()
+        self._redo = []
+        self._merge_open = False # Whether the next record() may extend the newest step
+
+    def record(self, key, before, after, merge_key=None, now=None):
+        """
+        Records that `key` (a tool name, or None for all settings) changed from `before` to `after`.
+        Returns True if a new step was started, False if the change was merged into the newest step.
+        """
+        now = time.monotonic() if now is None else now
+        self._drop_redo()
+        last = self._undo[-1] if self._undo else None
+        if last is not None and self._merge_open and last.key == key and (
+                (merge_key is not None and merge_key == last.merge_key)
+                or (merge_key is None and last.merge_key is None and now - last.time <= self.merge_seconds)):
+            self.current_bytes -= last.nbytes
+            last.after = after
+            last.time = now
+            last.nbytes = last._measure()
+            self.current_bytes += last.nbytes
+            if last.before == last.after:
+                # The change was undone by hand; the step no longer does anything
+                self._undo.pop()
+                self.current_bytes -= last.nbytes
+                self._merge_open = False
+            return False
+
+        entry = HistoryEntry(key, before, after, merge_key, now)
+        self._undo.append(entry)
+        self.current_bytes += entry.nbytes
+        self._merge_open = True
+        self._enforce_budget()
+        return True
+
+    def undo(self):
+        """Steps back. Returns (key, settings to restore), or None if there is nothing to undo."""
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        self._redo.append(entry)
+        self._merge_open = False
+        return entry.key, entry.before
+
+    def redo(self):
+        """Steps forward again. Returns (key, settings to restore), or None if there is nothing to redo."""
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        self._undo.append(entry)
+        self._merge_open = False
+        return entry.key, entry.after
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def clear(self):
+        self._undo.clear()
+        self._redo = []
+        self.current_bytes = 0
+        self._merge_open = False
+
+    def _drop_redo(self):
+        for entry in self._redo:
+            self.current_bytes -= entry.nbytes
+        self._redo = []
+
+    def _enforce_budget(self):
+        # Always keep the newest step, even if it alone exceeds the budget
+        while self.current_bytes > self.max_bytes and len(self._undo) > 1:
+            self.current_bytes -= self._undo.popleft().nbytes
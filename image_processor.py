@@ -9,22 +9,60 @@ Usage:
 - Used by AppController to load PNG images (preserving transparency), process them via tool chains, and save the results.
 - Handles conversion between file paths and OpenCV image arrays (NumPy ndarrays).
 - Ensures all images have a 4-channel (BGRA) format for consistent downstream processing.
+- Saves are atomic: the image is encoded in memory, written to a temporary file next to the target and renamed over
+  it, so other programs (e.g. the game) never see a half-written file. save() is safe to call from a worker thread.
+- DecodedImageCache (optional, used by the editor) keeps decoded images as .npy files in the per-user cache directory,
+  keyed by the SHA-256 of the source file. load() memory-maps a cached array instead of decoding the PNG again; a
+  small index of (path, size, mtime) -> hash means unchanged files are not even re-read. The cache is bounded by
+  size with least-recently-used eviction, and new entries are written on a background thread.
+- ImagePyramid provides power-of-two reductions of a processed image, so the display can resample zoomed-out views
+  from a level close to the displayed size instead of from the full-resolution image.
 
 Dependencies:
 - OpenCV (cv2) for image I/O and manipulation.
 - NumPy for array operations.
+- Standard Python modules: os, json, time, hashlib, tempfile, threading, concurrent.futures.
+- app_cache for the cache location.
 
 Intended for use as a backend utility within the application's controller to manage image data flow.
 """
 
-import cv2
-import numpy as np
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app_cache
+from lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+def _read_umask():
+    # The umask can only be read by setting it, for the whole process. Doing that while other threads create files
+    # would give those files the temporary mask, so it is read once, at import.
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# The process umask, applied to new files that save() creates
+_UMASK = _read_umask()
 
 class ImageProcessor:
     """
     Handles loading, processing, and saving images using OpenCV.
     """
-    def __init__(self):
+    # Formats that store BGRA pixels exactly, so a saved array is what load() would decode from the file
+    LOSSLESS_EXTENSIONS = (".png", ".tif", ".tiff")
+
+    def __init__(self, cache=None):
+        # Optional DecodedImageCache; loads are then memory-mapped from it when possible
+        self.cache = cache
         # original_image_cv holds the pristine image loaded from disk (in OpenCV format)
         self.original_image_cv = None
         # processed_image_cv holds the result of the latest manipulation
@@ -34,9 +72,21 @@ class ImageProcessor:
         """
         Loads an image from the given path using OpenCV.
         Crucially, it uses IMREAD_UNCHANGED to preserve the alpha (transparency) channel.
+        With a cache, a previously decoded copy is returned as a read-only memory-mapped array instead.
         """
+        digest = data = None
+        if self.cache is not None:
+            digest, data = self.cache.file_digest(path)
+            image = self.cache.get(digest)
+            if image is not None:
+                return image
+
         # cv2.imread loads images in BGR(A) format (Blue, Green, Red, Alpha)
-        image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if data is None:
+            image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        else:
+            # The file was just read for hashing; decode those bytes instead of reading it again
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
         if image is None:
             # This can happen if the file is corrupt or not a valid image format
             raise ValueError(f"Could not load image from path: {path}")
@@ -46,14 +96,228 @@ class ImageProcessor:
         if image.shape[2] == 3:
             print("Image is BGR, converting to BGRA")
             image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
-        
+
+        if self.cache is not None:
+            self.cache.put_async(digest, image)
         return image
 
     def save(self, path, image_data):
         """
         Saves the given image data (NumPy array) to the specified path.
+        The file is replaced atomically; on any error the previous file is left untouched.
+        Returns the SHA-256 hex digest of the written file.
         """
-        if image_data is not None:
-            cv2.imwrite(path, image_data)
-        else:
+        if image_data is None:
             raise ValueError("No processed image data to save.")
+
+        # Encode in memory first, in the format given by the file extension
+        extension = os.path.splitext(path)[1] or ".png"
+        ok, encoded = cv2.imencode(extension, image_data)
+        if not ok:
+            raise ValueError(f"Could not encode image as '{extension}': {path}")
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(encoded.data)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(path):
+                # mkstemp creates the file with private permissions; keep those of the file being replaced
+                os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+            else:
+                os.chmod(temp_path, 0o666 & ~_UMASK)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        digest = hashlib.sha256(encoded.data).hexdigest()
+        if self.cache is not None:
+            self.cache.remember_file(path, digest)
+            if extension.lower() in self.LOSSLESS_EXTENSIONS and image_data.ndim == 3 and image_data.shape[2] == 4:
+                # Reopening the saved file needs no decode either. Lossy or alpha-less formats decode to other
+                # pixels, so those are left to be cached by the next load.
+                self.cache.put_async(digest, image_data)
+        return digest
+
+
+class DecodedImageCache:
+    """
+    A size-bounded LRU disk cache of decoded images, stored as memory-mappable .npy files named by the SHA-256
+    of the source file. Safe to use from several threads.
+    """
+    INDEX_NAME = "index.json"
+    DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or app_cache.cache_dir("decoded")
+        self.max_bytes = max_bytes
+        self._index_path = os.path.join(self.directory, self.INDEX_NAME)
+        self._lock = threading.Lock()
+        self._files = {} # normalized path -> [size, mtime_ns, digest]
+        self._entries = {} # digest -> [nbytes, last used]
+        self._load_index()
+        # Cache files and the index are written here, off the caller's thread
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="decoded-cache")
+        self._pending = set() # digests being written
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self._files = index.get("files", {})
+            self._entries = index.get("entries", {})
+        except (OSError, ValueError, AttributeError):
+            self._files, self._entries = {}, {}
+
+    def _save_index(self):
+        with self._lock:
+            index = {"files": dict(self._files), "entries": dict(self._entries)}
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix=".index.", suffix=".tmp", dir=self.directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(temp_path, self._index_path)
+        except OSError as e:
+            print(f"Could not write decoded image cache index: {e}")
+
+    def _entry_path(self, digest):
+        return os.path.join(self.directory, f"{digest}.npy")
+
+    def file_digest(self, path):
+        """
+        Returns (digest, data): the SHA-256 of the file, and its bytes if they had to be read to compute it
+        (None if the size and mtime matched the index).
+        """
+        key = os.path.normcase(os.path.abspath(path))
+        stat = os.stat(path)
+        with self._lock:
+            known = self._files.get(key)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2], None
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._files[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest, data
+
+    def remember_file(self, path, digest):
+        """Records the digest of a file whose contents are known, e.g. one that was just written."""
+        stat = os.stat(path)
+        with self._lock:
+            self._files[os.path.normcase(os.path.abspath(path))] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    def get(self, digest):
+        """Returns the cached image as a read-only memory-mapped array, or None."""
+        try:
+            image = np.asarray(np.load(self._entry_path(digest), mmap_mode="r"))
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            if digest in self._entries:
+                self._entries[digest][1] = time.time()
+        self._writer.submit(self._save_index) # Persist the file digest and the new use time
+        return image
+
+    def put_async(self, digest, image):
+        """
+        Writes a decoded image to the cache on the background thread.
+        The array must not be modified afterwards (the editor keeps its images read-only).
+        """
+        with self._lock:
+            if digest in self._pending or (digest in self._entries and os.path.exists(self._entry_path(digest))):
+                return
+            self._pending.add(digest)
+        self._writer.submit(self._write, digest, image)
+
+    def _write(self, digest, image):
+        path = self._entry_path(digest)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                np.save(f, image, allow_pickle=False)
+            os.replace(temp_path, path)
+            with self._lock:
+                self._entries[digest] = [image.nbytes, time.time()]
+            self._evict(keep=digest)
+        except OSError as e:
+            print(f"Could not write decoded image cache entry: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        finally:
+            with self._lock:
+                self._pending.discard(digest)
+        self._save_index()
+
+    def _evict(self, keep=None):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            total = sum(entry[0] for entry in self._entries.values())
+            victims = []
+            for digest, (nbytes, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes:
+                    break
+                if digest != keep:
+                    victims.append(digest)
+                    total -= nbytes
+            for digest in victims:
+                del self._entries[digest]
+            evicted = set(victims)
+            self._files = {key: value for key, value in self._files.items() if value[2] not in evicted}
+        for digest in victims:
+            try:
+                os.remove(self._entry_path(digest))
+            except OSError:
+                pass # e.g. still mapped on Windows; the file is orphaned and overwritten if needed again
+
+    def flush(self):
+        """Waits for pending writes and saves the index. AppController.shutdown() calls it before the editor exits."""
+        self._writer.submit(self._save_index).result()
+
+
+class ImagePyramid:
+    """
+    A lazily built mipmap pyramid of an image. Level k is the base image reduced by 2**k
+    (INTER_AREA), built from level k-1 only when first requested.
+    """
+    def __init__(self):
+        self._levels = [None]
+
+    @property
+    def base(self):
+        return self._levels[0]
+
+    def set_base(self, image_data):
+        """Switches to a new base image. Levels are only rebuilt when they are asked for again."""
+        if image_data is not self._levels[0]:
+            self._levels = [image_data]
+
+    def level(self, index):
+        """Returns level `index`, building any missing levels on the way."""
+        while len(self._levels) <= index:
+            previous = self._levels[-1]
+            height, width = previous.shape[:2]
+            if width == 1 and height == 1:
+                break
+            size = (max(1, width // 2), max(1, height // 2))
+            self._levels.append(cv2.resize(previous, size, interpolation=cv2.INTER_AREA))
+        return self._levels[min(index, len(self._levels) - 1)]
+
+    def level_for_scale(self, scale):
+        """
+        Returns the smallest level that is still at least as large as the base shown at `scale`,
+        so the display only ever downsamples from it.
+        """
+        if self.base is None:
+            return None
+        index = 0
+        while scale * (2 ** (index + 1)) <= 1.0:
+            index += 1
+        return self.level(index)
@@ -0,0 +1,45 @@
+"""
+lazy_import.py
+
+This module provides lazy_import(), which returns a module object whose actual import is deferred until one of its
+attributes is first used. The application uses it for its heavy dependencies (OpenCV, NumPy, Pillow, PyYAML) so the
+main window can appear before they are loaded.
+
+Usage:
+    cv2 = lazy_import("cv2")   # instead of: import cv2
+    cv2.imread(...)            # the real import happens here
+
+Note: modules that use lazily imported names in annotations need `from __future__ import annotations`, otherwise the
+annotation itself triggers the import when the function is defined. Lazy loading is only thread-safe from Python
+3.12 on, so code that starts several threads using a lazily imported module calls resolve() on it first.
+
+Dependencies:
+- Standard Python modules: importlib, sys.
+"""
+
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """
+    Returns the module `name`, loading it on first attribute access.
+    If the module is already imported, it is returned as is.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def resolve(*modules):
+    """Completes the import of lazily imported modules now, e.g. before several threads start using them."""
+    for module in modules:
+        getattr(module, "__name__") # Any attribute access finishes loading
@@ -10,6 +10,11 @@ Usage:
 - Run this script directly to launch the image editor GUI.
 - The AppController is responsible for all image processing, file operations, and tool management.
 - The MainWindow provides the graphical interface and user interaction.
+- `python main.py --startup-report` prints how long each startup phase and import took (see profiling.StartupReport).
+- Heavy dependencies (OpenCV, NumPy, Pillow, PyYAML) are imported lazily, and the tool panels are built after the
+  window is first drawn, so the window appears as early as possible.
+- On exit, the controller finishes pending saves and writes the decoded image cache's index (AppController.shutdown).
+- Image processing runs on one thread per CPU core; set RWR_TWEAK_WORKERS=<n> to use another number of threads.
 
 Dependencies:
 - tkinter for the GUI
@@ -19,22 +24,38 @@ Dependencies:
 This module is not intended to be imported; it should be run as the main script.
 """
 
+import sys
+import time
+
+_START_TIME = time.perf_counter()
+
+from profiling import startup_report
+if __name__ == "__main__" and "--startup-report" in sys.argv[1:]:
+    startup_report.start(_START_TIME)
+
 import tkinter as tk
 from gui.main_window import MainWindow
 from app_controller import AppController
 
 if __name__ == "__main__":
+    startup_report.phase("imports")
+
     # Create the main application window
     root = tk.Tk()
+    startup_report.phase("tk root")
     
     # Create the controller
     controller_instance = AppController() 
     
     # Create the main window (view) and pass the controller to it
     main_view = MainWindow(root, controller_instance)
+    startup_report.phase("main window")
     
     # Give the controller a reference to the view
     controller_instance.set_view(main_view)
     
     # Start the Tkinter event loop
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+
+    # The window is closed; finish pending saves before the process exits
+    controller_instance.shutdown()
\ No newline at end of file
@@ -2,83 +2,300 @@
 path_finder.py
 
 This module provides utility functions for locating the Steam installation directory and the installation path
-of a specific Steam game (by app ID) on Windows systems. It reads Windows registry keys to find the main Steam
-directory, parses Steam's libraryfolders.vdf to enumerate all Steam library locations, and inspects appmanifest
-files to determine the install directory of a given game.
+of a specific Steam game (by app ID) on Windows, Linux and macOS. It finds the Steam directories (the Windows
+registry when available, plus the usual install locations), parses Steam's libraryfolders.vdf files to enumerate
+all Steam library locations, and inspects appmanifest files to determine the install directory of a given game.
 
 Usage:
 - Used by the GUI (main_window.py) to automatically locate the "Running With Rifles" (RWR) installation and its
-  los.png file, enabling quick access for image editing.
+  los.png file, enabling quick access for image editing. The GUI calls it from a background thread.
 - Can be reused for any Steam game by specifying a different app_id.
+- Results are cached on disk (see app_cache.py), keyed by the modification times of every libraryfolders.vdf and
+  appmanifest file that was consulted, so later lookups only stat a handful of files.
 
 Functions:
+- parse_vdf(text): Parses Valve KeyValues (VDF/ACF) text into nested dictionaries.
+- find_steam_install_paths(): Returns the existing Steam installation directories, most likely first.
 - find_steam_install_path(): Returns the path to the Steam installation directory, or None if not found.
+- find_library_paths(steam_path): Returns the Steam library folders listed by an installation.
 - find_game_install_path(app_id): Returns the install path for the specified Steam app ID, or None if not found.
+- find_rwr_los_path(): Returns the path of RWR's vanilla los.png, or None if not found.
 
 Dependencies:
-- winreg (Windows only), os, re
+- winreg (Windows only, optional), os, sys, json, app_cache
 
 Intended for use as a backend utility to support game file discovery in the application's GUI.
 """
 
-import winreg
+import json
 import os
+import sys
+
+import app_cache
+
+RWR_APP_ID = 270150
+RWR_LOS_SUFFIX = "media/packages/vanilla/textures/los.png"
+
+DISCOVERY_CACHE_NAME = "steam_discovery.json"
+
+_VDF_ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", '"': '"'}
+
+
+def _tokenize_vdf(text):
+    """Yields the tokens of a VDF document: quoted or bare strings, "{" and "}". Comments and conditionals are skipped."""
+    index = 0
+    length = len(text)
+    while index < length:
+        char = text[index]
+        if char.isspace():
+            index += 1
+        elif char == "/" and text.startswith("//", index):
+            # Comment to the end of the line
+            newline = text.find("\n", index)
+            index = length if newline == -1 else newline + 1
+        elif char in "{}":
+            yield char
+            index += 1
+        elif char == "[":
+            # Platform conditional such as [$WIN32], which applies to the previous key/value
+            closing = text.find("]", index)
+            index = length if closing == -1 else closing + 1
+        elif char == '"':
+            index += 1
+            chars = []
+            while index < length and text[index] != '"':
+                if text[index] == "\\" and index + 1 < length:
+                    escaped = text[index + 1]
+                    chars.append(_VDF_ESCAPES.get(escaped, "\\" + escaped))
+                    index += 2
+                else:
+                    chars.append(text[index])
+                    index += 1
+            yield "".join(chars)
+            index += 1 # closing quote
+        else:
+            start = index
+            while index < length and not text[index].isspace() and text[index] not in '{}"':
+                index += 1
+            yield text[start:index]
+
+
+def parse_vdf(text):
+    """
+    Parses Valve KeyValues text (libraryfolders.vdf, appmanifest_*.acf, ...) into nested dictionaries.
+
+    Keys are lowercased, since Steam treats them case-insensitively and has changed their case between versions.
+    Malformed input never raises; whatever could be parsed is returned.
+    """
+    root = {}
+    stack = [root]
+    key = None
+    for token in _tokenize_vdf(text):
+        if token == "{":
+            child = {}
+            if key is not None:
+                stack[-1][key] = child
+                key = None
+            stack.append(child)
+        elif token == "}":
+            if len(stack) > 1:
+                stack.pop()
+            key = None
+        elif key is None:
+            key = token.lower()
+        else:
+            stack[-1][key] = token
+            key = None
+    return root
+
+
+def _registry_steam_paths():
+    """Returns the Steam directories recorded in the Windows registry (nothing on other platforms)."""
+    try:
+        import winreg
+    except ImportError:
+        return []
+    paths = []
+    for hive, subkey, value in (
+        (winreg.HKEY_CURRENT_USER, "Software\\Valve\\Steam", "SteamPath"),
+        (winreg.HKEY_LOCAL_MACHINE, "SOFTWARE\\WOW6432Node\\Valve\\Steam", "InstallPath"),
+        (winreg.HKEY_LOCAL_MACHINE, "SOFTWARE\\Valve\\Steam", "InstallPath"),
+    ):
+        try:
+            key = winreg.OpenKey(hive, subkey)
+            try:
+                steam_path, _ = winreg.QueryValueEx(key, value)
+            finally:
+                winreg.CloseKey(key)
+            paths.append(steam_path)
+        except OSError:
+            pass
+    return paths
+
+
+def _candidate_steam_paths():
+    """Returns every place a Steam installation may live on this platform, most likely first."""
+    candidates = _registry_steam_paths()
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        for variable in ("ProgramFiles(x86)", "ProgramFiles"):
+            if os.environ.get(variable):
+                candidates.append(os.path.join(os.environ[variable], "Steam"))
+    elif sys.platform == "darwin":
+        candidates.append(os.path.join(home, "Library", "Application Support", "Steam"))
+    else:
+        data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(home, ".local", "share")
+        candidates += [
+            os.path.join(home, ".steam", "steam"),
+            os.path.join(home, ".steam", "root"),
+            os.path.join(data_home, "Steam"),
+            os.path.join(home, ".var", "app", "com.valvesoftware.Steam", ".local", "share", "Steam"), # Flatpak
+            os.path.join(home, "snap", "steam", "common", ".local", "share", "Steam"),
+        ]
+    return candidates
+
+
+def find_steam_install_paths():
+    """Returns the existing Steam installation directories, most likely first, without duplicates (e.g. symlinks)."""
+    paths = []
+    seen = set()
+    for candidate in _candidate_steam_paths():
+        if not os.path.isdir(candidate):
+            continue
+        real_path = os.path.normcase(os.path.realpath(candidate))
+        if real_path not in seen:
+            seen.add(real_path)
+            paths.append(candidate)
+    return paths
+
 
 def find_steam_install_path():
     """
-    Finds the Steam installation path on Windows.
+    Finds the Steam installation path.
     """
+    paths = find_steam_install_paths()
+    return paths[0] if paths else None
+
+
+def _library_folders_vdf(steam_path):
+    return os.path.join(steam_path, "steamapps", "libraryfolders.vdf")
+
+
+def find_library_paths(steam_path):
+    """
+    Returns the library folders listed in an installation's libraryfolders.vdf, starting with the installation itself.
+    Understands both the current format ("0" { "path" "..." }) and the old one ("1" "D:\\Games").
+    """
+    library_paths = [steam_path]
     try:
-        key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, "Software\\Valve\\Steam")
-        steam_path, _ = winreg.QueryValueEx(key, "SteamPath")
-        winreg.CloseKey(key)
-        return steam_path
+        with open(_library_folders_vdf(steam_path), "r", encoding="utf-8", errors="replace") as f:
+            data = parse_vdf(f.read())
+    except OSError:
+        return library_paths
+
+    folders = data.get("libraryfolders")
+    if not isinstance(folders, dict):
+        return library_paths
+    for key, entry in folders.items():
+        if isinstance(entry, dict):
+            path = entry.get("path")
+        elif key.isdigit():
+            path = entry
+        else:
+            continue
+        if path and os.path.normcase(os.path.normpath(path)) not in (
+                os.path.normcase(os.path.normpath(p)) for p in library_paths):
+            library_paths.append(path)
+    return library_paths
+
+
+def _file_stamp(path):
+    try:
+        return os.stat(path).st_mtime_ns
     except OSError:
         return None
 
+
+def _scan_game_install_path(app_id):
+    """
+    Searches every Steam library for the game.
+    Returns (install path or None, {consulted file: mtime_ns or None}) so the result can be cached.
+    """
+    stamps = {}
+    for steam_path in find_steam_install_paths():
+        stamps[_library_folders_vdf(steam_path)] = _file_stamp(_library_folders_vdf(steam_path))
+        for library_path in find_library_paths(steam_path):
+            app_manifest_path = os.path.join(library_path, "steamapps", f"appmanifest_{app_id}.acf")
+            stamps[app_manifest_path] = _file_stamp(app_manifest_path)
+            if stamps[app_manifest_path] is None:
+                continue
+            try:
+                with open(app_manifest_path, "r", encoding="utf-8", errors="replace") as manifest_file:
+                    manifest = parse_vdf(manifest_file.read())
+            except OSError:
+                continue
+            install_dir = manifest.get("appstate", {}).get("installdir")
+            if install_dir:
+                return os.path.join(library_path, "steamapps", "common", install_dir), stamps
+    return None, stamps
+
+
+def _load_discovery_cache():
+    try:
+        with open(os.path.join(app_cache.cache_dir(), DISCOVERY_CACHE_NAME), "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_discovery_cache(cache):
+    try:
+        path = os.path.join(app_cache.cache_dir(), DISCOVERY_CACHE_NAME)
+        temp_path = path + f".{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not write Steam discovery cache: {e}")
+
+
 # rwr_steam_id = 270150
-def find_game_install_path(app_id=270150):
+def find_game_install_path(app_id=RWR_APP_ID, use_cache=True):
     """
     Finds the installation path of a game given its Steam app ID.
 
     Args:
         app_id (int): The Steam app ID of the game.
+        use_cache (bool): Reuse the cached result while none of the files it was derived from has changed.
 
     Returns:
         str: The installation path of the game, or None if not found.
     """
-    steam_path = find_steam_install_path()
-    if not steam_path:
-        print("Steam install path not found.")
-        return None
-
-    library_folders_vdf = os.path.join(steam_path, "steamapps", "libraryfolders.vdf")
-
-    try:
-        with open(library_folders_vdf, "r", encoding="utf-8") as f:
-            vdf_content = f.read()
-
-        # Simple parsing of libraryfolders.vdf to find library paths.
-        import re
-        library_paths = []
-        for match in re.finditer(r'"(?:path|installpath)"\s+"(.*?)"', vdf_content):
-            library_paths.append(match.group(1).replace("\\\\", "\\")) # replace double backslashes which are escaped in the vdf.
+    cache = _load_discovery_cache() if use_cache else {}
+    entry = cache.get(str(app_id))
+    if isinstance(entry, dict) and entry.get("stamps") and all(
+            _file_stamp(path) == stamp for path, stamp in entry["stamps"].items()):
+        return entry.get("path")
 
-        for library_path in library_paths:
-            app_manifest_path = os.path.join(library_path, "steamapps", f"appmanifest_{app_id}.acf")
-            if os.path.exists(app_manifest_path):
-                # Simple parsing of appmanifest.acf to find install path.
-                with open(app_manifest_path, "r", encoding="utf-8") as manifest_file:
-                    manifest_content = manifest_file.read()
+    install_path, stamps = _scan_game_install_path(app_id)
+    if use_cache and stamps:
+        cache[str(app_id)] = {"path": install_path, "stamps": stamps}
+        _save_discovery_cache(cache)
+    return install_path
 
-                install_dir_match = re.search(r'"installdir"\s+"(.*?)"', manifest_content)
-                if install_dir_match:
-                    return os.path.join(library_path, "steamapps", "common", install_dir_match.group(1))
 
+def find_rwr_los_path(use_cache=True):
+    """
+    Returns the path of RWR's vanilla los.png, or None if RWR or the file could not be found.
+    """
+    rwr_path = find_game_install_path(RWR_APP_ID, use_cache)
+    if not rwr_path:
+        print("RWR installation path not found.")
         return None
 
-    except FileNotFoundError:
-        return None
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    rwr_los_path = os.path.join(rwr_path, RWR_LOS_SUFFIX)
+    if not os.path.exists(rwr_los_path):
+        print(f"RWR LOS file not found at {rwr_los_path}.")
         return None
+    return rwr_los_path
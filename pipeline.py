@@ -0,0 +1,398 @@
+"""
+pipeline.py
+
+This module provides the ToolPipeline class, which runs a chain of image editing tools over an OpenCV (BGRA) image.
+Consecutive tools that can describe themselves as pointwise per-channel mappings (see BaseTool.get_luts) are fused
+into one combined lookup table and applied in a single pass over the image. Tools that cannot do this fall back to
+their regular apply() method, which ends the current fused run.
+
+Usage:
+- The AppController builds a list of (tool_name, tool_instance, settings) stages and calls run() with the original image.
+- The pipeline never modifies its input; it returns either a new array or, if nothing changes, the input itself.
+- Materialized stage outputs are kept in a memory-capped LRU StageCache, keyed by the source image and the settings of
+  every stage so far. A change to a later tool resumes from the cached output of the stages before it.
+- run() can write its final pass into a caller-owned buffer (see PingPongBuffers and BaseTool.apply_into), so
+  interactive runs reuse two preallocated frames instead of allocating a new one each time.
+- Lookup tables are applied in horizontal bands of rows. run_streaming() writes every band straight into a preallocated
+  (or in-place) output, so pointwise stages need no full-size temporaries; batch.py uses it for very large images.
+- run() accepts a `cancelled` callable that is checked between passes and bands, so superseded work on a worker
+  thread can stop early by raising PipelineCancelled.
+- Bands are processed in parallel on a pool of worker threads (OpenCV and NumPy release the GIL): lookup table passes,
+  value histograms (computed per band and combined), and non-pointwise tools that declare themselves band-safe
+  (BaseTool.band_safe). The band size adapts to the image size and the number of workers, which defaults to the
+  number of CPU cores and can be set with the RWR_TWEAK_WORKERS environment variable. With one worker, bands run
+  one after another on the calling thread.
+
+Dependencies:
+- OpenCV (cv2) for histogram and lookup table operations.
+- NumPy for table composition.
+
+Intended for use as a GUI-free backend utility, so it can also run from worker threads or batch scripts.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from lazy_import import lazy_import, resolve
+from profiling import tracer
+from tools.base_tool import identity_luts
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+def build_stages(available_tools, settings):
+    """
+    Returns the (tool_name, tool_instance, settings) stages for every tool that has settings, in tool order.
+    The settings of each stage are the tool's immutable settings object (see BaseTool.make_settings).
+
+    :param available_tools: A dict of tool name -> tool instance, as returned by tools.discover_tools().
+    :param settings: A dict of tool name -> settings dictionary, as stored by the ConfigManager.
+    """
+    return [
+        (tool_name, tool_instance, tool_instance.make_settings(settings[tool_name]))
+        for tool_name, tool_instance in available_tools.items()
+        if tool_name in settings
+    ]
+
+
+def default_workers():
+    """Returns the number of band workers: RWR_TWEAK_WORKERS if it is set, else the number of CPU cores."""
+    try:
+        return max(1, int(os.environ.get("RWR_TWEAK_WORKERS", "")))
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+def channel_presence(image_data):
+    """
+    Returns a (256, channels) boolean array marking which values occur in each channel of the image.
+    """
+    channels = image_data.shape[2]
+    present = np.empty((256, channels), dtype=bool)
+    for c in range(channels):
+        present[:, c] = cv2.calcHist([image_data], [c], None, [256], [0, 256]).ravel() > 0
+    return present
+
+
+def compose_luts(first, second):
+    """Returns the table equivalent to applying `first` and then `second`, channel by channel."""
+    return np.take_along_axis(second, first.astype(np.intp), axis=0)
+
+
+def map_presence(present, luts):
+    """Returns which values occur in each channel after applying `luts` to an image with `present` values."""
+    mapped = np.zeros_like(present)
+    for c in range(present.shape[1]):
+        mapped[luts[present[:, c], c], c] = True
+    return mapped
+
+
+class PipelineCancelled(Exception):
+    """Raised by ToolPipeline.run when its `cancelled` callback reports that the result is no longer wanted."""
+    pass
+
+
+def freeze_settings(settings):
+    """Returns a hashable version of a settings value, so it can be used in cache keys. ToolSettings already are."""
+    if isinstance(settings, dict):
+        return tuple(sorted((key, freeze_settings(value)) for key, value in settings.items()))
+    if isinstance(settings, (list, tuple)):
+        return tuple(freeze_settings(value) for value in settings)
+    return settings
+
+
+class StageCache:
+    """
+    A memory-capped LRU cache of intermediate pipeline results.
+
+    Entries are keyed by the identity of the source image plus the (tool_name, settings) signatures
+    of every stage that produced them, so a result can be reused as the starting point for any
+    later run that shares the same prefix of stages.
+    """
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict() # key -> (source, result, presence)
+        self._lock = threading.Lock()
+
+    def get(self, source, signatures):
+        """Returns the cached (result, presence) for this source and stage prefix, or None."""
+        key = (id(source),) + tuple(signatures)
+        with self._lock:
+            entry = self._entries.get(key)
+            # Check identity too, in case the id of a freed source image has been reused
+            if entry is None or entry[0] is not source:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, source, signatures, result, presence):
+        key = (id(source),) + tuple(signatures)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1].nbytes
+            if result.nbytes > self.max_bytes:
+                return
+            self._entries[key] = (source, result, presence)
+            self.current_bytes += result.nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+
+    def forget(self, source=None):
+        """Drops every entry computed from `source`, or the whole cache if source is None."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if source is None or entry[0] is source]:
+                self.current_bytes -= self._entries.pop(key)[1].nbytes
+
+
+class PingPongBuffers:
+    """
+    A pair of preallocated output buffers that pipeline runs alternate between.
+
+    Each run writes into the buffer that is not holding the result currently in use,
+    so steady-state slider drags allocate no new frames.
+    """
+    def __init__(self):
+        self._buffers = []
+
+    def acquire(self, shape, dtype, keep=None):
+        """
+        Returns a buffer of the given shape and dtype that is not `keep`.
+        Both buffers are reallocated when the shape or dtype changes.
+        """
+        if not self._buffers or self._buffers[0].shape != shape or self._buffers[0].dtype != dtype:
+            self._buffers = [np.empty(shape, dtype), np.empty(shape, dtype)]
+        return self._buffers[1] if self._buffers[0] is keep else self._buffers[0]
+
+    def owns(self, array):
+        """True if `array` is one of the buffers, i.e. a later run may overwrite it."""
+        return any(array is buffer for buffer in self._buffers)
+
+    def release(self):
+        self._buffers = []
+
+
+class ToolPipeline:
+    """
+    Runs a chain of tools over an image, fusing adjacent lookup-table tools into a single pass.
+    """
+    # Rows per band when lookup tables are applied band by band (at most, when bands run in parallel)
+    DEFAULT_BAND_HEIGHT = 256
+    # Parallel bands: a few per worker to even out the load, but none so small that scheduling dominates
+    BANDS_PER_WORKER = 4
+    MIN_BAND_PIXELS = 64 * 1024
+
+    def __init__(self, cache_bytes=512 * 1024 * 1024, band_height=DEFAULT_BAND_HEIGHT, workers=None):
+        self.band_height = band_height
+        self.workers = workers or default_workers()
+        self._band_executor = None # Created on first parallel use
+        self._band_executor_lock = threading.Lock()
+        # Stage outputs, so a change to tool K resumes from the cached output of the stages before it
+        self.stage_cache = StageCache(cache_bytes)
+        # The value histogram of recent source images, so slider drags don't re-scan the original.
+        # Stored as (source, presence) pairs and replaced as a whole, so worker threads can share it.
+        self._presence_cache = ()
+
+    def _source_presence(self, image_data):
+        for source, present in self._presence_cache:
+            if source is image_data:
+                return present
+        present = self._presence(image_data)
+        # Keep the full image and its proxy around, dropping the oldest entry
+        self._presence_cache = ((image_data, present),) + self._presence_cache[:1]
+        return present
+
+    def run(self, image_data, stages, cancelled=None, out=None):
+        """
+        Applies the given stages to the image, resuming from the longest cached prefix of stages.
+
+        :param image_data: The OpenCV image to process. It is never modified.
+        :param stages: A list of (tool_name, tool_instance, settings) tuples, in order.
+        :param cancelled: Optional callable; if it returns True between passes or bands, PipelineCancelled is raised.
+        :param out: Optional preallocated array (same shape and dtype as the input) for the final pass.
+                    Results written there are not cached, since the caller reuses the buffer.
+        :return: The processed image: out, a cached or new array, or image_data itself if nothing changes.
+        """
+        signatures = [(tool_name, freeze_settings(settings)) for tool_name, _, settings in stages]
+        start, current_image, present = self._cached_prefix(image_data, signatures)
+        combined = None
+
+        for index in range(start, len(stages)):
+            tool_name, tool_instance, settings = stages[index]
+            if cancelled is not None and cancelled():
+                raise PipelineCancelled()
+            if present is None:
+                with tracer.span("presence"):
+                    present = (self._source_presence(current_image) if current_image is image_data
+                               else self._presence(current_image))
+
+            with tracer.span(f"tool:{tool_name}:luts"):
+                luts = tool_instance.get_luts(settings, present)
+            if luts is None:
+                # Not a pointwise tool: flush the fused run and let the tool process the image itself
+                current_image = self._flush(image_data, signatures[:index], current_image, combined, present, cancelled)
+                if out is not None and index == len(stages) - 1:
+                    return self._apply_tool(tool_name, tool_instance, current_image, settings, out, cancelled)
+                result = self._apply_tool(tool_name, tool_instance, current_image, settings, cancelled=cancelled)
+                if result is not current_image:
+                    self.stage_cache.put(image_data, signatures[:index + 1], result, None)
+                current_image = result
+                present = combined = None
+                continue
+
+            combined = luts if combined is None else compose_luts(combined, luts)
+            present = map_presence(present, luts)
+
+        if cancelled is not None and cancelled():
+            raise PipelineCancelled()
+        if out is not None:
+            return self._stream_luts(current_image, combined, out, cancelled)
+        return self._flush(image_data, signatures, current_image, combined, present, cancelled)
+
+    def run_streaming(self, image_data, stages, out=None, cancelled=None):
+        """
+        Applies the given stages band by band, writing into a preallocated output.
+
+        Pointwise (lookup-table) stages need no full-size temporaries at all; only non-pointwise
+        stages are applied to the whole image. The stage cache is not used.
+
+        :param image_data: The OpenCV image to process. Only modified if it is also `out`.
+        :param stages: A list of (tool_name, tool_instance, settings) tuples, in order.
+        :param out: The output array, same shape and dtype as the input. May be image_data itself
+                    to process in place. Allocated if None.
+        :param cancelled: Optional callable, checked before every band.
+        :return: The output array.
+        """
+        if out is None:
+            out = np.empty_like(image_data)
+        current_image = image_data
+        present = None
+        combined = None
+
+        for tool_name, tool_instance, settings in stages:
+            if cancelled is not None and cancelled():
+                raise PipelineCancelled()
+            if present is None:
+                with tracer.span("presence"):
+                    present = self._presence(current_image)
+
+            with tracer.span(f"tool:{tool_name}:luts"):
+                luts = tool_instance.get_luts(settings, present)
+            if luts is None:
+                current_image = self._stream_luts(current_image, combined, out, cancelled)
+                result = self._apply_tool(tool_name, tool_instance, current_image, settings, out, cancelled)
+                if result is not out:
+                    out[...] = result
+                current_image = out
+                present = combined = None
+                continue
+
+            combined = luts if combined is None else compose_luts(combined, luts)
+            present = map_presence(present, luts)
+
+        current_image = self._stream_luts(current_image, combined, out, cancelled)
+        if current_image is not out:
+            out[...] = current_image
+        return out
+
+    def _cached_prefix(self, image_data, signatures):
+        """Returns (stage index, image, presence) to resume from: the longest cached prefix, or the source itself."""
+        for index in range(len(signatures), 0, -1):
+            cached = self.stage_cache.get(image_data, signatures[:index])
+            if cached is not None:
+                return index, cached[0], cached[1]
+        return 0, image_data, None
+
+    def _flush(self, image_data, signatures, current_image, combined, present, cancelled=None):
+        """Applies a pending fused table and caches the materialized output under its stage prefix."""
+        result = self._apply_luts(current_image, combined, cancelled)
+        if result is not current_image:
+            self.stage_cache.put(image_data, signatures, result, present)
+        return result
+
+    def _apply_luts(self, image_data, luts, cancelled=None):
+        """Applies a combined table in one pass into a new array, skipping the pass entirely if it changes nothing."""
+        if luts is None or np.array_equal(luts, identity_luts(luts.shape[1])):
+            return image_data
+        return self._stream_luts(image_data, luts, np.empty_like(image_data), cancelled)
+
+    def _stream_luts(self, src, luts, dst, cancelled=None):
+        """
+        Applies a combined table from src into dst, one band of rows at a time.
+        src and dst may be the same array. Returns src unchanged if the table is an identity.
+        """
+        if luts is None or np.array_equal(luts, identity_luts(luts.shape[1])):
+            return src
+        table = luts.reshape(256, 1, -1)
+        with tracer.span("lut_pass"):
+            self._for_bands(src, lambda top, bottom: cv2.LUT(src[top:bottom], table, dst=dst[top:bottom]), cancelled)
+        return dst
+
+    def _apply_tool(self, tool_name, tool_instance, src, settings, out=None, cancelled=None):
+        """
+        Runs a non-pointwise tool over src, into out if given. Band-safe tools run band by band on the workers,
+        others over the whole image at once.
+        """
+        with tracer.span(f"tool:{tool_name}:apply"):
+            if tool_instance.band_safe and self.workers > 1 and len(self._bands(src)) > 1:
+                dst = np.empty_like(src) if out is None else out
+                self._for_bands(src, lambda top, bottom: tool_instance.apply_into(
+                    src[top:bottom], dst[top:bottom], settings), cancelled)
+                return dst
+            if out is not None:
+                return tool_instance.apply_into(src, out, settings)
+            return tool_instance.apply(src, settings)
+
+    def _presence(self, image_data):
+        """channel_presence() of the image, computed band by band on the workers and combined."""
+        if self.workers == 1:
+            return channel_presence(image_data)
+        bands = self._for_bands(image_data, lambda top, bottom: channel_presence(image_data[top:bottom]))
+        return np.logical_or.reduce(bands)
+
+    def _bands(self, image_data):
+        """
+        Returns the (top, bottom) row ranges to process an image in. With one worker these are band_height rows
+        each; with more, about BANDS_PER_WORKER bands per worker, at most band_height rows and (unless that limit
+        is reached) at least MIN_BAND_PIXELS each.
+        """
+        rows, columns = image_data.shape[:2]
+        height = self.band_height
+        if self.workers > 1:
+            height = max(-(-rows // (self.workers * self.BANDS_PER_WORKER)), -(-self.MIN_BAND_PIXELS // max(columns, 1)))
+            height = max(1, min(height, self.band_height))
+        return [(top, min(top + height, rows)) for top in range(0, rows, height)]
+
+    def _for_bands(self, image_data, function, cancelled=None):
+        """
+        Calls function(top, bottom) for every band of the image, on the workers if there are several bands.
+        Returns the results in band order. `cancelled` is checked before every band.
+
+        Only returns or raises once no band is running any more: bands write into buffers (such as the ping-pong
+        frames) that are handed to the next run as soon as this one ends.
+        """
+        def run_band(band):
+            if cancelled is not None and cancelled():
+                raise PipelineCancelled()
+            return function(*band)
+
+        bands = self._bands(image_data)
+        if self.workers == 1 or len(bands) == 1:
+            return [run_band(band) for band in bands]
+        futures = [self._band_pool().submit(run_band, band) for band in bands]
+        wait(futures)
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
+        return [future.result() for future in futures]
+
+    def _band_pool(self):
+        with self._band_executor_lock:
+            if self._band_executor is None:
+                resolve(cv2, np) # The band workers must not race to finish the lazy imports
+                self._band_executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="band")
+            return self._band_executor
@@ -0,0 +1,205 @@
+"""
+profiling.py
+
+This module provides lightweight timing instrumentation for the application's hot paths.
+
+A single global Tracer records named spans (tool passes, BGRA->RGBA conversion, resize, checkerboard composite,
+PhotoImage creation, ...) and end-to-end input-to-pixel latency. When tracing is disabled, span() returns a shared
+no-op context manager, so instrumented code pays almost nothing.
+
+Usage:
+- Enable with the environment variable RWR_TWEAK_TRACE=1, or with View > Trace Timing in the GUI.
+- Wrap a stage with `with tracer.span("name"):`.
+- Call tracer.mark_input() when a user input arrives and tracer.frame_presented() once its pixels are on screen.
+- tracer.summary() returns rolling p50/p95 figures for the status bar; export_chrome_trace() writes a Chrome
+  trace-event JSON file that can be opened in chrome://tracing or Perfetto.
+- `python main.py --startup-report` uses the global startup_report to print, once the tool panels are built, the time
+  of each startup phase (imports, Tk root, main window, first frame, tool panels) and a `-X importtime`-style table
+  of the modules imported before that point.
+
+Dependencies:
+- Standard Python modules only (os, sys, time, json, builtins, threading, collections, contextlib).
+"""
+
+import builtins
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Tracer:
+    """
+    Records timing spans and rolling statistics. Safe to use from worker threads.
+    """
+    def __init__(self, enabled=False, window=200, max_events=100_000):
+        self.enabled = enabled
+        self.window = window
+        self._events = deque(maxlen=max_events) # (name, start_s, duration_s, thread_id)
+        self._durations = {} # name -> deque of recent durations in seconds
+        self._pending_input = None # perf_counter of the oldest input not yet on screen
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        """Returns a context manager timing the enclosed block as `name` (a no-op when disabled)."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name)
+
+    @contextlib.contextmanager
+    def _span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start)
+
+    def record(self, name, start, duration):
+        """Records a finished span that started at `start` (perf_counter seconds)."""
+        with self._lock:
+            self._events.append((name, start, duration, threading.get_ident()))
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = deque(maxlen=self.window)
+            durations.append(duration)
+
+    def mark_input(self):
+        """Notes that a user input arrived. Coalesced inputs keep the oldest timestamp."""
+        if self.enabled and self._pending_input is None:
+            self._pending_input = time.perf_counter()
+
+    def frame_presented(self):
+        """Notes that a frame reached the screen, closing the input-to-pixel latency of pending inputs."""
+        if self._pending_input is not None:
+            start, self._pending_input = self._pending_input, None
+            if self.enabled:
+                self.record("latency", start, time.perf_counter() - start)
+
+    def stats(self, name):
+        """Returns (p50, p95) in milliseconds over the rolling window for `name`, or None."""
+        with self._lock:
+            durations = self._durations.get(name)
+            values = sorted(durations) if durations else None
+        if not values:
+            return None
+        return _percentile(values, 0.5) * 1000.0, _percentile(values, 0.95) * 1000.0
+
+    def summary(self, names=("latency", "pipeline", "update_display")):
+        """Returns a short one-line summary of the rolling stats, for the status bar."""
+        parts = []
+        for name in names:
+            stats = self.stats(name)
+            if stats:
+                parts.append(f"{name} p50 {stats[0]:.1f} / p95 {stats[1]:.1f} ms")
+        return " | ".join(parts)
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._durations.clear()
+            self._pending_input = None
+
+    def export_chrome_trace(self, path):
+        """Writes all recorded spans to `path` in Chrome trace-event JSON format."""
+        with self._lock:
+            events = list(self._events)
+        trace_events = [
+            {
+                "name": name,
+                "cat": "rwr_tweak",
+                "ph": "X",
+                "ts": start * 1_000_000.0,
+                "dur": duration * 1_000_000.0,
+                "pid": os.getpid(),
+                "tid": thread_id,
+            }
+            for name, start, duration, thread_id in events
+        ]
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+
+class StartupReport:
+    """
+    Times the startup phases of the application and the modules imported on the way.
+
+    Imports are timed by wrapping builtins.__import__, so only modules loaded after start() are listed. Modules that
+    are still lazy proxies (see lazy_import) when the report is printed are listed as deferred.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._start = None
+        self._phases = [] # (name, seconds since start)
+        self._imports = [] # [depth, name, cumulative seconds, self seconds]
+        self._stack = [] # indices into _imports of the imports in progress
+        self._original_import = None
+
+    def start(self, start_time=None):
+        """Starts the report. `start_time` is the perf_counter value to measure phases from (default: now)."""
+        self.enabled = True
+        self._start = time.perf_counter() if start_time is None else start_time
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        entry = [len(self._stack), name, 0.0, 0.0]
+        index = len(self._imports)
+        self._imports.append(entry)
+        self._stack.append(index)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            entry[2] = time.perf_counter() - start
+            self._stack.pop()
+            children = sum(child[2] for child in self._imports[index + 1:] if child[0] == entry[0] + 1)
+            entry[3] = entry[2] - children
+
+    def phase(self, name):
+        """Records that the startup phase `name` has just finished."""
+        if self.enabled:
+            self._phases.append((name, time.perf_counter() - self._start))
+
+    def finish(self, file=None):
+        """Stops timing imports and prints the report (to stderr by default). Does nothing if not started."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        if builtins.__import__ is self._timed_import:
+            builtins.__import__ = self._original_import
+        print(self.format(), file=file or sys.stderr)
+
+    def format(self):
+        lines = ["Startup phases (ms since start):"]
+        previous = 0.0
+        for name, elapsed in self._phases:
+            lines.append(f"  {elapsed * 1000.0:8.1f}  (+{(elapsed - previous) * 1000.0:7.1f})  {name}")
+            previous = elapsed
+        lines.append("Imports before the first frame:")
+        lines.append("  import time: self [us] | cumulative | imported package")
+        for depth, name, cumulative, self_time in self._imports:
+            lines.append(f"  import time: {self_time * 1e6:9.0f} | {cumulative * 1e6:10.0f} | {'  ' * depth}{name}")
+        deferred = sorted(name for name, module in list(sys.modules.items())
+                          if type(module).__name__ == "_LazyModule")
+        if deferred:
+            lines.append("Deferred (lazy, not yet loaded): " + ", ".join(deferred))
+        return "\n".join(lines)
+
+
+# The application-wide tracer
+tracer = Tracer(enabled=os.environ.get("RWR_TWEAK_TRACE", "") not in ("", "0"))
+
+# The application startup report, started by `main.py --startup-report`
+startup_report = StartupReport()
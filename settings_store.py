@@ -0,0 +1,269 @@
+"""
+settings_store.py
+
+This module provides the SettingsStore class, an optional SQLite database of tool settings that sits alongside the
+per-image YAML sidecars written by ConfigManager. Each row holds the settings last saved for one image, indexed by
+image path, by the content hash of the image written with those settings, and by preset name, so the editor and
+batch.py can load settings with one indexed query instead of finding and parsing sidecar files. Each row also
+records the content hash of the unprocessed source the settings were applied to.
+
+Usage:
+- open_default() returns the store in the per-user data directory (see app_cache.py), or None if it is disabled
+  (RWR_TWEAK_SETTINGS_DB=off) or cannot be opened. RWR_TWEAK_SETTINGS_DB=<path> uses another database file.
+- The AppController records settings on every save and looks them up when an image is opened. They are only applied
+  again if the opened file is still the unprocessed source (its hash is the row's source_hash); a file that was saved
+  with the settings already contains them.
+- batch.py --stored applies each image's settings under the same rule, and skips images they were already applied to.
+- Presets are named settings files: loading a settings file in the editor, or passing one to batch.py, registers
+  it under its file name (without extension); images saved with exactly those settings are tagged with it.
+- Command line, for moving between the store and YAML sidecars:
+    python settings_store.py import textures/ -r     # read <image>.png.yaml sidecars into the store
+    python settings_store.py export textures/ -r     # write the stored settings out as sidecars
+    python settings_store.py find --preset dark_los  # list images saved with a preset
+    python settings_store.py find --hash <sha256>    # list images whose saved file has this content
+
+Settings are stored as JSON, which round-trips the plain bool/int/float dictionaries the tools use.
+The store is safe to use from several threads; writes are serialized.
+
+Dependencies:
+- Standard Python modules: os, sys, json, time, sqlite3, threading, argparse.
+- app_cache for the default location, config_manager for the YAML sidecars.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import app_cache
+
+DEFAULT_NAME = "settings.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_settings (
+    path TEXT PRIMARY KEY,  -- normalized absolute image path
+    content_hash TEXT,      -- SHA-256 of the image file as saved with these settings, if known
+    preset TEXT,            -- name of the preset these settings came from, if unchanged
+    settings TEXT NOT NULL, -- JSON
+    updated REAL NOT NULL,
+    source_hash TEXT        -- SHA-256 of the unprocessed image the settings were applied to, if known
+);
+CREATE INDEX IF NOT EXISTS image_settings_hash ON image_settings (content_hash);
+CREATE INDEX IF NOT EXISTS image_settings_preset ON image_settings (preset);
+CREATE TABLE IF NOT EXISTS presets (
+    name TEXT PRIMARY KEY,
+    settings TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+def normalize_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def open_default():
+    """Returns the per-user SettingsStore, or None if it is disabled or unavailable."""
+    location = os.environ.get("RWR_TWEAK_SETTINGS_DB")
+    if location is not None and location.strip().lower() in ("", "0", "off", "no", "false"):
+        return None
+    try:
+        return SettingsStore(location or os.path.join(app_cache.data_dir(), DEFAULT_NAME))
+    except (OSError, sqlite3.Error) as e:
+        print(f"Settings store unavailable: {e}")
+        return None
+
+
+class SettingsStore:
+    """
+    SQLite-backed tool settings, indexed by image path, content hash and preset name.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(image_settings)")]
+            if "source_hash" not in columns:
+                # Databases created before source hashes were recorded
+                self._connection.execute("ALTER TABLE image_settings ADD COLUMN source_hash TEXT")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    # --- Per-image settings ---
+    def get(self, image_path):
+        """Returns the settings stored for an image, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT settings FROM image_settings WHERE path = ?", (normalize_path(image_path),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_entry(self, image_path):
+        """Returns (settings, content_hash, preset, source_hash) stored for an image, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT settings, content_hash, preset, source_hash FROM image_settings WHERE path = ?",
+                (normalize_path(image_path),)).fetchone()
+        return (json.loads(row[0]), row[1], row[2], row[3]) if row else None
+
+    def get_many(self, image_paths):
+        """
+        Returns {image path: (settings, source_hash)} for those of the given images that have stored settings,
+        in one query.
+        """
+        by_key = {normalize_path(path): path for path in image_paths}
+        if not by_key:
+            return {}
+        # In a transaction of its own: the writes to the temp table would otherwise leave one open, holding a read
+        # lock on the database that blocks every other connection's writes
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (path TEXT PRIMARY KEY)")
+            self._connection.execute("DELETE FROM wanted")
+            self._connection.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((key,) for key in by_key))
+            rows = self._connection.execute(
+                "SELECT s.path, s.settings, s.source_hash FROM image_settings s JOIN wanted w ON w.path = s.path"
+            ).fetchall()
+            self._connection.execute("DELETE FROM wanted")
+        return {by_key[key]: (json.loads(settings), source_hash) for key, settings, source_hash in rows}
+
+    def put(self, image_path, settings, content_hash=None, preset=None, source_hash=None):
+        """Stores the settings of an image, replacing any previous entry."""
+        self.put_many([(image_path, settings, content_hash, preset, source_hash)])
+
+    def put_many(self, entries):
+        """Stores many (image_path, settings, content_hash, preset, source_hash) entries in one transaction."""
+        now = time.time()
+        rows = [(normalize_path(path), content_hash, preset, json.dumps(settings), now, source_hash)
+                for path, settings, content_hash, preset, source_hash in entries]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO image_settings (path, content_hash, preset, settings, updated, source_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def find_by_hash(self, content_hash):
+        """Returns [(image path, settings)] for images saved with exactly this content."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT path, settings FROM image_settings WHERE content_hash = ? ORDER BY path",
+                (content_hash,)).fetchall()
+        return [(path, json.loads(settings)) for path, settings in rows]
+
+    def find_by_preset(self, preset):
+        """Returns the paths of the images saved with a preset."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT path FROM image_settings WHERE preset = ? ORDER BY path", (preset,)).fetchall()
+        return [row[0] for row in rows]
+
+    def all_entries(self):
+        """Returns {image path: settings} for every stored image."""
+        with self._lock:
+            rows = self._connection.execute("SELECT path, settings FROM image_settings ORDER BY path").fetchall()
+        return {path: json.loads(settings) for path, settings in rows}
+
+    # --- Presets ---
+    def put_preset(self, name, settings):
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO presets (name, settings, updated) VALUES (?, ?, ?)",
+                                     (name, json.dumps(settings), time.time()))
+
+    def get_preset(self, name):
+        """Returns the settings of a preset, or None."""
+        with self._lock:
+            row = self._connection.execute("SELECT settings FROM presets WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def preset_names(self):
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT name FROM presets ORDER BY name")]
+
+    # --- YAML sidecar compatibility ---
+    def import_sidecars(self, image_paths, config_manager=None):
+        """Reads the <image>.yaml sidecar of each image into the store. Returns the number imported."""
+        from config_manager import ConfigManager
+        config_manager = config_manager or ConfigManager()
+        entries = []
+        for image_path in image_paths:
+            sidecar = f"{image_path}.yaml"
+            if os.path.exists(sidecar):
+                settings = config_manager.load(sidecar)
+                if settings:
+                    # A sidecar is written next to the processed image, so nothing is known about its source
+                    entries.append((image_path, settings, None, None, None))
+        self.put_many(entries)
+        return len(entries)
+
+    def export_sidecars(self, image_paths=None, config_manager=None):
+        """Writes the stored settings of the given images (default: all) as <image>.yaml sidecars. Returns the count."""
+        from config_manager import ConfigManager
+        config_manager = config_manager or ConfigManager()
+        if image_paths is None:
+            entries = self.all_entries()
+        else:
+            entries = {path: settings for path, (settings, _) in self.get_many(image_paths).items()}
+        for image_path, settings in entries.items():
+            config_manager.save(f"{image_path}.yaml", settings)
+        return len(entries)
+
+
+def preset_name(settings_path):
+    """Returns the preset name of a settings file: its file name without extension."""
+    return os.path.splitext(os.path.basename(settings_path))[0]
+
+
+def _collect_images(paths, recursive):
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                if not recursive:
+                    dirnames[:] = []
+                images += [os.path.join(dirpath, name) for name in sorted(filenames) if name.lower().endswith(".png")]
+        else:
+            images.append(path)
+    return images
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the RWR Tweak settings store.")
+    parser.add_argument("--db", help="Database file (default: the per-user settings store).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("import", "Read <image>.png.yaml sidecars into the store."),
+                            ("export", "Write stored settings out as <image>.png.yaml sidecars.")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("paths", nargs="*", help="PNG files or directories (export: default all stored images).")
+        command.add_argument("-r", "--recursive", action="store_true", help="Include PNG files in subdirectories.")
+    find = commands.add_parser("find", help="List images by preset or content hash.")
+    group = find.add_mutually_exclusive_group(required=True)
+    group.add_argument("--preset", help="Preset name.")
+    group.add_argument("--hash", help="SHA-256 of the saved image file.")
+    args = parser.parse_args(argv)
+
+    store = SettingsStore(args.db) if args.db else open_default()
+    if store is None:
+        print("The settings store is disabled.")
+        return 1
+    if args.command == "import":
+        count = store.import_sidecars(_collect_images(args.paths, args.recursive))
+        print(f"Imported settings for {count} images.")
+    elif args.command == "export":
+        images = _collect_images(args.paths, args.recursive) if args.paths else None
+        count = store.export_sidecars(images)
+        print(f"Exported settings for {count} images.")
+    elif args.preset:
+        for path in store.find_by_preset(args.preset):
+            print(path)
+    else:
+        for path, _ in store.find_by_hash(args.hash):
+            print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# tests/test_app_controller.py
+# Opening, saving, resetting and closing images in a controller without a view.
+import cv2
+import numpy as np
+import pytest
+
+import app_cache
+import app_controller
+import tools
+from app_controller import AppController
+
+FADE = {'enabled': True, 'alpha': 60.0, 'falloff': 1.0, 'alpha_offset': 0.0}
+
+
+class SilentMessagebox:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+@pytest.fixture(autouse=True)
+def user_dirs(tmp_path, monkeypatch):
+    monkeypatch.setenv("RWR_TWEAK_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("RWR_TWEAK_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.delenv("RWR_TWEAK_SETTINGS_DB", raising=False)
+    monkeypatch.setattr(app_controller, "messagebox", SilentMessagebox())
+
+
+def new_session():
+    """A controller without a view, as in a fresh editor session. Renders, saves and resets finish before returning."""
+    controller = AppController()
+    controller.available_tools = tools.discover_tools()
+    return controller
+
+
+@pytest.fixture
+def texture(tmp_path):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (64, 48, 4), dtype=np.uint8)
+    image[..., 3] //= 3
+    path = str(tmp_path / "los.png")
+    cv2.imwrite(path, image)
+    return path
+
+
+def test_stored_settings_apply_to_their_source(texture):
+    controller = new_session()
+    controller.open_image(texture)
+    controller.apply_changes('transparency', dict(FADE))
+    controller.save_tool_settings()
+
+    controller = new_session()
+    controller.open_image(texture)
+    assert controller.settings == {'transparency': FADE}
+
+
+def test_saved_image_is_not_processed_again_on_reopen(texture):
+    controller = new_session()
+    controller.open_image(texture)
+    controller.apply_changes('transparency', dict(FADE))
+    controller.save_image()
+    saved = cv2.imread(texture, cv2.IMREAD_UNCHANGED)
+
+    controller = new_session()
+    controller.open_image(texture)
+    assert controller.settings == {}
+    np.testing.assert_array_equal(controller.original_image_cv, saved)
+
+
+def test_reset_image_is_not_processed_again_on_reopen(texture):
+    original = cv2.imread(texture, cv2.IMREAD_UNCHANGED)
+    controller = new_session()
+    controller.open_image(texture)
+    controller.apply_changes('transparency', dict(FADE))
+    controller.save_image()
+    controller.reset_image()
+    np.testing.assert_array_equal(cv2.imread(texture, cv2.IMREAD_UNCHANGED), original)
+
+    controller = new_session()
+    controller.open_image(texture)
+    assert controller.settings == {}
+    controller.update_view()
+    np.testing.assert_array_equal(controller.processed_image_cv, original)
+
+
+def test_shutdown_writes_the_decoded_image_cache_index(texture):
+    controller = new_session()
+    controller.open_image(texture)
+    controller.apply_changes('transparency', dict(FADE))
+    controller.save_image()
+    digest = app_cache.content_hash(texture)
+    controller.shutdown()
+
+    assert new_session().processor.cache.file_digest(texture) == (digest, None)
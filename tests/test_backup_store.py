@@ -0,0 +1,95 @@
+# tests/test_backup_store.py
+# Backing up, deduplicating and restoring image originals.
+import os
+
+import pytest
+
+import app_cache
+from backup_store import BackupStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BackupStore(str(tmp_path / "backups"))
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_backup_and_restore_round_trip(store, tmp_path):
+    image = write(tmp_path / "los.png", b"original pixels")
+    digest = store.backup(image)
+    assert digest == app_cache.content_hash(image)
+    assert read(store.object_path(digest)) == b"original pixels"
+
+    write(image, b"edited pixels")
+    assert store.restore(image) == digest
+    assert read(image) == b"original pixels"
+
+
+def test_later_backups_keep_the_first_original(store, tmp_path):
+    image = write(tmp_path / "los.png", b"original pixels")
+    digest = store.backup(image)
+    write(image, b"edited and saved")
+    # Opening the edited image again must not replace its original
+    assert store.backup(image) == digest
+    store.restore(image)
+    assert read(image) == b"original pixels"
+
+
+def test_identical_originals_are_stored_once(store, tmp_path):
+    first = write(tmp_path / "a.png", b"same texture")
+    second = write(tmp_path / "b.png", b"same texture")
+    assert store.backup(first) == store.backup(second)
+    stored = [name for _, _, names in os.walk(store.root) for name in names if name != "index.json"]
+    assert len(stored) == 1
+
+
+def test_backup_does_not_share_data_with_the_source(store, tmp_path):
+    image = write(tmp_path / "los.png", b"original pixels")
+    digest = store.backup(image)
+    assert not os.path.samefile(image, store.object_path(digest))
+    # Rewriting the image in place (as the game or another tool might) leaves the backup intact
+    with open(image, "r+b") as f:
+        f.write(b"OVERWRITTEN")
+    store.restore(image)
+    assert read(image) == b"original pixels"
+
+
+def test_legacy_bak_is_taken_as_the_original(store, tmp_path):
+    image = write(tmp_path / "los.png", b"edited pixels")
+    write(tmp_path / "los.png.bak", b"original pixels")
+    store.backup(image)
+    store.restore(image)
+    assert read(image) == b"original pixels"
+
+
+def test_restore_refuses_a_modified_backup(store, tmp_path):
+    image = write(tmp_path / "los.png", b"original pixels")
+    digest = store.backup(image)
+    write(store.object_path(digest), b"tampered")
+    write(image, b"edited pixels")
+    with pytest.raises(ValueError):
+        store.restore(image)
+    assert read(image) == b"edited pixels"
+
+
+def test_restore_without_backup(store, tmp_path):
+    image = write(tmp_path / "los.png", b"pixels")
+    assert store.backup_hash(image) is None
+    with pytest.raises(FileNotFoundError):
+        store.restore(image)
+
+
+def test_index_survives_a_new_store(store, tmp_path):
+    image = write(tmp_path / "los.png", b"original pixels")
+    digest = store.backup(image)
+    assert BackupStore(store.root).backup_hash(image) == digest
@@ -0,0 +1,66 @@
+# tests/test_batch.py
+# Running the batch CLI with stored settings must never apply them twice.
+import cv2
+import numpy as np
+import pytest
+
+import app_cache
+import batch
+import settings_store
+from config_manager import ConfigManager
+
+FADE = {'transparency': {'enabled': True, 'alpha': 60.0, 'falloff': 1.0, 'alpha_offset': 0.0}}
+
+
+@pytest.fixture(autouse=True)
+def user_dirs(tmp_path, monkeypatch):
+    monkeypatch.setenv("RWR_TWEAK_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("RWR_TWEAK_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.delenv("RWR_TWEAK_SETTINGS_DB", raising=False)
+
+
+@pytest.fixture
+def texture(tmp_path):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (64, 48, 4), dtype=np.uint8)
+    image[..., 3] //= 3
+    (tmp_path / "textures").mkdir()
+    path = str(tmp_path / "textures" / "los.png")
+    cv2.imwrite(path, image)
+    return path
+
+
+def run(*args):
+    return batch.main([*args, "--jobs", "1"])
+
+
+def test_stored_in_place_runs_do_not_compound(tmp_path, texture):
+    original_hash = app_cache.content_hash(texture)
+    settings_path = str(tmp_path / "fade.yaml")
+    ConfigManager().save(settings_path, FADE)
+    assert run(settings_path, texture, "--in-place") == 0
+    processed = cv2.imread(texture, cv2.IMREAD_UNCHANGED)
+    assert app_cache.content_hash(texture) != original_hash
+
+    for _ in range(2):
+        assert run(settings_path, texture, "--in-place", "--stored") == 0
+        np.testing.assert_array_equal(cv2.imread(texture, cv2.IMREAD_UNCHANGED), processed)
+
+    # The store still knows the original the settings were applied to
+    store = settings_store.open_default()
+    assert store.get_many([texture]) == {texture: (FADE, original_hash)}
+    store.close()
+
+
+def test_stored_settings_apply_to_their_source(tmp_path, texture):
+    original = cv2.imread(texture, cv2.IMREAD_UNCHANGED)
+    store = settings_store.open_default()
+    store.put(texture, FADE, source_hash=app_cache.content_hash(texture))
+    store.close()
+    settings_path = str(tmp_path / "off.yaml")
+    ConfigManager().save(settings_path, {'transparency': {'enabled': False}})
+
+    assert run(settings_path, texture, "-o", str(tmp_path / "out"), "--stored") == 0
+    result = cv2.imread(str(tmp_path / "out" / "los.png"), cv2.IMREAD_UNCHANGED)
+    assert not np.array_equal(result[..., 3], original[..., 3])
+    np.testing.assert_array_equal(result[..., :3], original[..., :3])
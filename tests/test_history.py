@@ -0,0 +1,93 @@
+# tests/test_history.py
+# Undo/redo and merging of steps in SettingsHistory.
+from history import SettingsHistory
+
+
+def fade(alpha):
+    return {'enabled': True, 'alpha': alpha}
+
+
+def test_undo_and_redo():
+    history = SettingsHistory(merge_seconds=0)
+    history.record('transparency', None, fade(10), now=0)
+    history.record('color', None, {'enabled': True}, now=10)
+    assert history.undo() == ('color', None)
+    assert history.undo() == ('transparency', None)
+    assert history.undo() is None
+    assert history.redo() == ('transparency', fade(10))
+    assert history.redo() == ('color', {'enabled': True})
+    assert history.redo() is None
+
+
+def test_new_change_drops_redo():
+    history = SettingsHistory(merge_seconds=0)
+    history.record('transparency', None, fade(10), now=0)
+    history.undo()
+    assert history.can_redo()
+    history.record('transparency', None, fade(20), now=10)
+    assert not history.can_redo()
+    assert history.undo() == ('transparency', None)
+
+
+def test_one_drag_is_one_step():
+    history = SettingsHistory()
+    assert history.record('transparency', fade(0), fade(5), merge_key=1, now=0)
+    assert not history.record('transparency', fade(5), fade(10), merge_key=1, now=5)
+    assert not history.record('transparency', fade(10), fade(15), merge_key=1, now=10)
+    # The next drag starts a new step, however soon it follows
+    assert history.record('transparency', fade(15), fade(20), merge_key=2, now=10.1)
+    assert history.undo() == ('transparency', fade(15))
+    assert history.undo() == ('transparency', fade(0))
+    assert not history.can_undo()
+
+
+def test_quick_changes_merge_within_the_time_window():
+    history = SettingsHistory(merge_seconds=0.75)
+    assert history.record('transparency', fade(0), fade(1), now=0)
+    assert not history.record('transparency', fade(1), fade(2), now=0.5)
+    assert history.record('transparency', fade(2), fade(3), now=2.0)
+    # Another tool never merges
+    assert history.record('color', None, {'enabled': True}, now=2.1)
+    assert history.undo() == ('color', None)
+    assert history.undo() == ('transparency', fade(2))
+    assert history.undo() == ('transparency', fade(0))
+
+
+def test_undo_closes_the_step_for_merging():
+    history = SettingsHistory()
+    history.record('transparency', fade(0), fade(5), merge_key=1, now=0)
+    history.undo()
+    history.redo()
+    assert history.record('transparency', fade(5), fade(10), merge_key=1, now=0.1)
+
+
+def test_change_reverted_by_hand_removes_the_step():
+    history = SettingsHistory()
+    history.record('transparency', fade(0), fade(5), merge_key=1, now=0)
+    history.record('transparency', fade(5), fade(0), merge_key=1, now=1)
+    assert not history.can_undo()
+    assert history.current_bytes == 0
+
+
+def test_memory_budget_drops_oldest_steps():
+    history = SettingsHistory(merge_seconds=0)
+    history.record('transparency', fade(0), fade(1), now=0)
+    step_bytes = history.current_bytes
+    history.max_bytes = step_bytes * 3
+    for step in range(1, 10):
+        history.record('transparency', fade(step), fade(step + 1), now=step)
+    assert history.current_bytes <= history.max_bytes
+    undone = []
+    while history.can_undo():
+        undone.append(history.undo())
+    assert undone[0] == ('transparency', fade(9))
+    assert len(undone) < 10
+
+
+def test_clear():
+    history = SettingsHistory()
+    history.record('transparency', None, fade(1), now=0)
+    history.undo()
+    history.clear()
+    assert not history.can_undo() and not history.can_redo()
+    assert history.current_bytes == 0
@@ -0,0 +1,44 @@
+# tests/test_image_processor.py
+# Atomic saves and the decoded image cache.
+import os
+import stat
+
+import numpy as np
+
+import image_processor
+from image_processor import ImageProcessor
+
+
+def make_image():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (32, 24, 4), dtype=np.uint8)
+
+
+def test_save_gives_new_files_the_umask_permissions(tmp_path):
+    path = str(tmp_path / "new.png")
+    ImageProcessor().save(path, make_image())
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~image_processor._UMASK
+    # Reading the umask for the save must not leave it changed
+    umask = os.umask(0o022)
+    os.umask(umask)
+    assert umask == image_processor._UMASK
+
+
+def test_save_keeps_the_permissions_of_a_replaced_file(tmp_path):
+    path = str(tmp_path / "existing.png")
+    ImageProcessor().save(path, make_image())
+    os.chmod(path, 0o640)
+    ImageProcessor().save(path, make_image())
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+def test_flush_persists_remembered_file_digests(tmp_path):
+    cache = image_processor.DecodedImageCache(str(tmp_path))
+    path = str(tmp_path / "saved.png")
+    with open(path, "wb") as f:
+        f.write(b"saved pixels")
+    cache.remember_file(path, "digest of the saved file")
+    cache.flush()
+
+    reopened = image_processor.DecodedImageCache(str(tmp_path))
+    assert reopened.file_digest(path) == ("digest of the saved file", None)
@@ -0,0 +1,93 @@
+# tests/test_path_finder.py
+# Parsing Steam's libraryfolders.vdf and listing library folders.
+import os
+
+from path_finder import find_library_paths, parse_vdf
+
+LIBRARY_FOLDERS_VDF = r'''
+// Written by Steam
+"LibraryFolders"
+{
+	"0"
+	{
+		"path"		"C:\\Program Files (x86)\\Steam"
+		"label"		""
+		"contentid"		"4213912873926393101"
+		"apps"
+		{
+			"228980"		"402397209"
+			"270150"		"1163472014"
+		}
+	}
+	"1"
+	{
+		"Path"		"D:\\SteamLibrary"
+		"label"		"Games \"fast\" disk"
+		"apps"
+		{
+		}
+	}
+}
+'''
+
+OLD_LIBRARY_FOLDERS_VDF = r'''
+"LibraryFolders"
+{
+	"TimeNextStatsReport"		"1612345678"
+	"ContentStatsID"		"-4213912873926393101"
+	"1"		"D:\\Games"
+	"2"		"E:\\Steam Library" [$WIN32]
+}
+'''
+
+
+def write_vdf(steam_path, text):
+    steamapps = os.path.join(steam_path, "steamapps")
+    os.makedirs(steamapps, exist_ok=True)
+    with open(os.path.join(steamapps, "libraryfolders.vdf"), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_parse_current_format():
+    data = parse_vdf(LIBRARY_FOLDERS_VDF)
+    folders = data["libraryfolders"]
+    assert folders["0"]["path"] == "C:\\Program Files (x86)\\Steam"
+    assert folders["0"]["apps"] == {"228980": "402397209", "270150": "1163472014"}
+    assert folders["1"]["path"] == "D:\\SteamLibrary" # key lowercased
+    assert folders["1"]["label"] == 'Games "fast" disk'
+    assert folders["1"]["apps"] == {}
+
+
+def test_parse_old_format_skips_conditionals():
+    folders = parse_vdf(OLD_LIBRARY_FOLDERS_VDF)["libraryfolders"]
+    assert folders["1"] == "D:\\Games"
+    assert folders["2"] == "E:\\Steam Library"
+    assert folders["timenextstatsreport"] == "1612345678"
+
+
+def test_parse_malformed_input_does_not_raise():
+    assert parse_vdf('"libraryfolders" { "0" { "path" "C:\\\\Steam"') == {
+        "libraryfolders": {"0": {"path": "C:\\Steam"}}}
+    assert parse_vdf("}}} {") == {}
+    assert parse_vdf("") == {}
+
+
+def test_find_library_paths_current_format(tmp_path):
+    steam = str(tmp_path / "Steam")
+    library = str(tmp_path / "SteamLibrary")
+    write_vdf(steam, '"libraryfolders" { "0" { "path" "%s" } "1" { "path" "%s" } }' % (
+        steam.replace("\\", "\\\\"), library.replace("\\", "\\\\")))
+    assert find_library_paths(steam) == [steam, library]
+
+
+def test_find_library_paths_old_format(tmp_path):
+    steam = str(tmp_path / "Steam")
+    write_vdf(steam, OLD_LIBRARY_FOLDERS_VDF)
+    assert find_library_paths(steam) == [steam, "D:\\Games", "E:\\Steam Library"]
+
+
+def test_find_library_paths_without_vdf(tmp_path):
+    steam = str(tmp_path / "Steam")
+    assert find_library_paths(steam) == [steam]
+    write_vdf(steam, '"something" { }')
+    assert find_library_paths(steam) == [steam]
@@ -0,0 +1,84 @@
+# tests/test_pipeline.py
+# The fused lookup-table pipeline must give exactly the result of applying the tools one after another.
+import numpy as np
+import pytest
+
+from pipeline import ToolPipeline, build_stages
+from tools.color_tool import ColorTool
+from tools.transparency_tool import TransparencyTool
+
+TRANSPARENCY = {
+    'off': {'enabled': False, 'alpha': 50.0},
+    'fade_out': {'enabled': True, 'alpha': -40.0, 'falloff': 1.0, 'alpha_offset': 0.0},
+    'fade_in': {'enabled': True, 'alpha': 60.0, 'falloff': 0.5, 'alpha_offset': 0.0},
+    'offset': {'enabled': True, 'alpha': 20.0, 'falloff': 1.5, 'alpha_offset': 40.0},
+}
+COLOR = {
+    'off': {'enabled': False, 'hue': 30},
+    'teal': {'enabled': True, 'hue': -60, 'saturation': 80.0, 'value': 200.0},
+}
+
+
+class NotPointwiseColorTool(ColorTool):
+    """The ColorTool without lookup tables, so the pipeline has to run it through apply()."""
+    def get_luts(self, settings, present):
+        return None
+
+
+@pytest.fixture(scope="module")
+def image():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (300, 257, 4), dtype=np.uint8)
+    image[..., 3] //= 3 # Alpha values well below 255, so the alpha offset has an effect
+    return image
+
+
+def apply_sequentially(image, stages):
+    for _, tool, settings in stages:
+        image = tool.apply(image, settings)
+    return image
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("color", sorted(COLOR))
+@pytest.mark.parametrize("transparency", sorted(TRANSPARENCY))
+@pytest.mark.parametrize("order", ["transparency_first", "color_first"])
+def test_fused_luts_match_sequential_apply(image, workers, color, transparency, order):
+    tools = {'transparency': TransparencyTool(), 'color': ColorTool()}
+    if order == "color_first":
+        tools = dict(reversed(list(tools.items())))
+    stages = build_stages(tools, {'transparency': TRANSPARENCY[transparency], 'color': COLOR[color]})
+    expected = apply_sequentially(image, stages)
+
+    pipeline = ToolPipeline(workers=workers, band_height=64)
+    np.testing.assert_array_equal(pipeline.run(image, stages), expected)
+    np.testing.assert_array_equal(pipeline.run(image, stages, out=np.empty_like(image)), expected)
+    streamed = image.copy()
+    np.testing.assert_array_equal(pipeline.run_streaming(streamed, stages, out=streamed), expected)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_non_pointwise_stage_between_fused_runs(image, workers):
+    tools = {'transparency': TransparencyTool(), 'color': NotPointwiseColorTool(), 'fade': TransparencyTool()}
+    settings = {'transparency': TRANSPARENCY['offset'], 'color': COLOR['teal'], 'fade': TRANSPARENCY['fade_out']}
+    stages = build_stages(tools, settings)
+    expected = apply_sequentially(image, stages)
+
+    pipeline = ToolPipeline(workers=workers, band_height=64)
+    np.testing.assert_array_equal(pipeline.run(image, stages, out=np.empty_like(image)), expected)
+    # Again, resuming from the cached output of the stages before the last one
+    np.testing.assert_array_equal(pipeline.run(image, stages), expected)
+
+
+def test_input_is_never_modified(image):
+    original = image.copy()
+    stages = build_stages({'transparency': TransparencyTool(), 'color': ColorTool()},
+                          {'transparency': TRANSPARENCY['offset'], 'color': COLOR['teal']})
+    ToolPipeline().run(image, stages, out=np.empty_like(image))
+    np.testing.assert_array_equal(image, original)
+
+
+def test_no_enabled_stage_returns_input(image):
+    stages = build_stages({'transparency': TransparencyTool(), 'color': ColorTool()},
+                          {'transparency': TRANSPARENCY['off'], 'color': COLOR['off']})
+    assert ToolPipeline().run(image, stages) is image
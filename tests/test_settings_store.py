@@ -0,0 +1,22 @@
+# tests/test_settings_store.py
+# Looking up the stored settings of many images at once.
+from settings_store import SettingsStore
+
+FADE = {'transparency': {'enabled': True, 'alpha': 60.0}}
+
+
+def test_get_many_returns_settings_and_source_hash(tmp_path):
+    store = SettingsStore(str(tmp_path / "settings.sqlite3"))
+    store.put("a.png", FADE, "processed", "fade", "original")
+    store.put("b.png", {})
+    assert store.get_many(["a.png", "b.png", "c.png"]) == {"a.png": (FADE, "original"), "b.png": ({}, None)}
+    assert store.get_many([]) == {}
+
+
+def test_get_many_does_not_block_other_connections(tmp_path):
+    path = str(tmp_path / "settings.sqlite3")
+    reader, writer = SettingsStore(path), SettingsStore(path)
+    writer.put("a.png", FADE)
+    assert reader.get_many(["a.png"]) == {"a.png": (FADE, None)}
+    writer.put("a.png", {}) # Raises "database is locked" if the lookup left a transaction open
+    assert reader.get("a.png") == {}
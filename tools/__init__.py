@@ -0,0 +1,107 @@
+# tools/__init__.py
+# Tool plugin package. Every BaseTool subclass in a module of this package is picked up by discover_tools().
+# The result of the scan is kept in a small manifest in the user cache directory, so later startups only import the
+# modules that actually define tools. The manifest is rebuilt whenever a module in this package is added, removed or
+# modified.
+
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+
+MANIFEST_NAME = "tool_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _module_stamps():
+    """Returns {module name: [mtime_ns, size]} for every module in this package."""
+    stamps = {}
+    for finder, name, ispkg in pkgutil.iter_modules(__path__, __name__ + "."):
+        filename = os.path.join(finder.path, name.rsplit(".", 1)[-1] + ".py")
+        try:
+            stat = os.stat(filename)
+            stamps[name] = [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            stamps[name] = None
+    return stamps
+
+
+def _manifest_path():
+    import app_cache
+    return os.path.join(app_cache.cache_dir(), MANIFEST_NAME)
+
+
+def _load_manifest(stamps):
+    """Returns the cached [[tool key, module name, class name], ...] entries, or None if missing or out of date."""
+    try:
+        with open(_manifest_path(), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get("version") != MANIFEST_VERSION or manifest.get("package") != os.path.abspath(__path__[0])
+            or manifest.get("modules") != stamps):
+        return None
+    return manifest.get("tools")
+
+
+def _save_manifest(stamps, entries):
+    try:
+        path = _manifest_path()
+        temp_path = path + f".{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "package": os.path.abspath(__path__[0]),
+                       "modules": stamps, "tools": entries}, f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        # The manifest is only a startup shortcut
+        print(f"Could not write tool manifest: {e}")
+
+
+def _scan_tools():
+    """Imports every module of the package and returns [[tool key, module name, class name], ...]."""
+    from .base_tool import BaseTool
+
+    entries = []
+    # Discover modules in the 'tools' package
+    discovered_plugins = {
+        name: importlib.import_module(name)
+        for finder, name, ispkg
+        in pkgutil.iter_modules(__path__, __name__ + ".")
+    }
+
+    for name, module in discovered_plugins.items():
+        # Find classes within the module
+        for i in inspect.getmembers(module, inspect.isclass):
+            class_obj = i[1]
+            # Check if it's a subclass of BaseTool and not BaseTool itself, defined in this module
+            if issubclass(class_obj, BaseTool) and class_obj is not BaseTool and class_obj.__module__ == name:
+                # The key for the tool will be the module name minus "_tool"
+                tool_key = module.__name__.split('.')[-1].replace("_tool", "")
+                entries.append([tool_key, name, class_obj.__name__])
+    return entries
+
+
+def discover_tools(use_manifest=True):
+    """
+    Dynamically discovers and instantiates all tool plugins in this package.
+    Does not create any GUI, so it can be used without tkinter.
+
+    :param use_manifest: Use (and refresh) the cached discovery manifest instead of always scanning every module.
+    :return: A dict of tool key (module name minus "_tool") -> tool instance, in discovery order.
+    """
+    entries = None
+    if use_manifest:
+        stamps = _module_stamps()
+        entries = _load_manifest(stamps)
+    if entries is None:
+        entries = _scan_tools()
+        if use_manifest:
+            _save_manifest(stamps, entries)
+
+    available_tools = {}
+    for tool_key, module_name, class_name in entries:
+        class_obj = getattr(importlib.import_module(module_name), class_name)
+        # Instantiate the tool
+        available_tools[tool_key] = class_obj()
+    return available_tools
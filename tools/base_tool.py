@@ -1,31 +1,157 @@
-# The abstract base class defines the contract for all tools.
+# The abstract base classes define the contract for all tools: their settings, processing and widgets.
+from __future__ import annotations
 
 from abc import ABC, abstractmethod
-import numpy as np
-from typing import Any
+
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+
+def identity_luts(channels: int = 4) -> np.ndarray:
+    """Returns a (256, channels) uint8 table that maps every channel value to itself."""
+    return np.repeat(np.arange(256, dtype=np.uint8)[:, None], channels, axis=1)
+
+
+class ToolSettings:
+    """
+    The parameters of a tool as an immutable value object, independent of any widgets.
+
+    Subclasses list their fields in __slots__ and give each one a default in DEFAULTS; values are converted to the
+    type of their default. Instances compare and hash by value, so they can be used in cache keys. Settings files,
+    the settings store and the undo history keep plain dictionaries (see from_dict/to_dict).
+    """
+    __slots__ = ()
+    DEFAULTS: dict = {}
+
+    def __init__(self, **values):
+        unknown = set(values) - set(self.__slots__)
+        if unknown:
+            raise TypeError(f"Unknown {type(self).__name__} fields: {', '.join(sorted(unknown))}")
+        for name in self.__slots__:
+            default = self.DEFAULTS[name]
+            value = values.get(name)
+            object.__setattr__(self, name, default if value is None else type(default)(value))
+
+    @classmethod
+    def from_dict(cls, values) -> ToolSettings:
+        """Returns the settings for a settings dictionary (unknown keys are ignored) or None; instances pass through."""
+        if isinstance(values, cls):
+            return values
+        if not values:
+            return cls()
+        return cls(**{name: values[name] for name in cls.__slots__ if name in values})
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def replace(self, **changes) -> ToolSettings:
+        """Returns a copy with some fields changed."""
+        return type(self)(**{**self.to_dict(), **changes})
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other._values() == self._values()
+
+    def __hash__(self):
+        return hash((type(self), self._values()))
+
+    def __reduce__(self):
+        return type(self).from_dict, (self.to_dict(),)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
 
 class BaseTool(ABC):
-    @abstractmethod
-    def create_gui(self, parent_frame, controller):
-        """Creates the Tkinter widgets for this tool."""
-        pass
+    """
+    The processing side of a tool. It never touches widgets: every method gets its settings passed in, so tools can
+    run on worker threads and without a GUI (batch.py). The widgets live in a ToolPanel, see create_panel().
+    """
+    # The ToolSettings subclass holding this tool's parameters
+    settings_class = ToolSettings
+    # True if apply_into() on a band of rows gives exactly those rows of the whole-image result, so the pipeline
+    # may run the tool on several bands in parallel. Tools that look at the whole image must leave this False.
+    band_safe = False
+
+    def make_settings(self, settings) -> ToolSettings:
+        """Returns the settings as this tool's settings object: from a settings dictionary, None (defaults) or as is."""
+        return self.settings_class.from_dict(settings)
 
     @abstractmethod
-    def get_settings(self) -> Any:
-        """Returns the current settings from the GUI widgets."""
-        pass
-    
-    @abstractmethod
-    def set_settings(self, settings):
-        """Applies loaded settings to the GUI widgets."""
+    def create_panel(self, controller) -> ToolPanel:
+        """Returns the widget layer of this tool (not yet built, see ToolPanel.create_gui)."""
         pass
 
     @abstractmethod
-    def apply(self, image_data: np.ndarray) -> np.ndarray:
+    def apply(self, image_data: np.ndarray, settings) -> np.ndarray:
         """
         Applies the tool's effect to the given image.
         
         :param image: The OpenCV image to process.
+        :param settings: The settings to apply: a ToolSettings, a settings dictionary, or None for the defaults.
         :return: The processed image.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def apply_into(self, src: np.ndarray, dst: np.ndarray, settings) -> np.ndarray:
+        """
+        Applies the tool's effect to src, writing the result into the preallocated dst.
+
+        Tools can override this to avoid allocating their output. dst has the same shape and dtype
+        as src and may be src itself. The default runs apply() and copies the result into dst.
+
+        :return: dst.
+        """
+        result = self.apply(src, settings)
+        if result is not dst:
+            dst[...] = result
+        return dst
+
+    def get_luts(self, settings, present: np.ndarray) -> np.ndarray | None:
+        """
+        Describes the tool as a pointwise per-channel mapping, if it is one.
+
+        Tools that can express their effect as a lookup table per channel should override this,
+        so the controller can fuse them with neighbouring tools into a single pass over the image.
+        
+        :param settings: The settings to apply.
+        :param present: A (256, channels) boolean array marking which values occur in each
+                        channel of the input image. Only needed by tools with data-dependent tables.
+        :return: A (256, channels) uint8 table, or None if the tool must run through apply().
+        """
+        return None
+
+
+class ToolPanel(ABC):
+    """
+    The Tkinter widgets of a tool. A panel shows one ToolSettings and reports every edit to the controller
+    (AppController.apply_changes) as a new settings object; it never processes images itself.
+    """
+    def __init__(self, tool: BaseTool, controller):
+        self.tool = tool
+        self.controller = controller
+
+    @abstractmethod
+    def create_gui(self, parent_frame):
+        """Creates the Tkinter widgets for this tool."""
+        pass
+
+    @abstractmethod
+    def get_settings(self) -> ToolSettings:
+        """Returns the settings shown by the widgets."""
+        pass
+    
+    @abstractmethod
+    def set_settings(self, settings):
+        """Shows the given settings (a ToolSettings or a settings dictionary) in the widgets."""
+        pass
@@ -1,23 +1,112 @@
 # tools/color_tool.py
+from __future__ import annotations
 
-from email.mime import image
-import re
-import tkinter as tk
-from tkinter import ttk
-import cv2
-import numpy as np
-from .base_tool import BaseTool
+from lazy_import import lazy_import
+from .base_tool import BaseTool, ToolPanel, ToolSettings, identity_luts
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from app_controller import AppController
 
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+class ColorSettings(ToolSettings):
+    __slots__ = ("enabled", "hue", "saturation", "value")
+    DEFAULTS = {
+        'enabled': False,
+        'hue': 0,             # Hue shift, -90 to 90
+        'saturation': 100.0,  # Percent, 0 to 200
+        'value': 127.0,       # Brightness, 0 to 255
+    }
+
+
 class ColorTool(BaseTool):
     """
     A tool for adjusting Hue, Saturation, and Value (Brightness).
     """
-    def create_gui(self, parent_frame, controller: "AppController"):
-        self.controller = controller
+    settings_class = ColorSettings
+    # Number of resolved colors kept around while dragging sliders
+    COLOR_CACHE_SIZE = 32
+    # Every pixel is filled independently of the others
+    band_safe = True
+
+    def __init__(self):
+        self._color_cache = {}
+
+    def create_panel(self, controller: "AppController"):
+        return ColorPanel(self, controller)
+
+    def _resolve_color(self, hue, saturation, value_scale):
+        """
+        Converts the HSV settings into the single BGR color the tool fills with.
+        The conversion runs on a 1x1 pixel and the result is cached per settings.
+        """
+        key = (hue, saturation, value_scale)
+        if key in self._color_cache:
+            return self._color_cache[key]
+
+        # Clamp and normalize
+        hue = np.clip(hue, -180, 180)
+        sat = np.clip(saturation, 0, 200) / 100.0
+
+        hsv = np.array([[[hue % 180, int(np.clip(sat * 255, 0, 255)), value_scale]]], dtype=np.uint8)
+        color_bgr = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0, 0]
+
+        if len(self._color_cache) >= self.COLOR_CACHE_SIZE:
+            self._color_cache.pop(next(iter(self._color_cache)), None) # May run on several band workers at once
+        self._color_cache[key] = color_bgr
+        return color_bgr
+
+    def _settings_color(self, settings):
+        """Returns the cached BGR fill color for ColorSettings."""
+        return self._resolve_color(settings.hue, settings.saturation, settings.value)
+
+    def get_luts(self, settings, present):
+        """Returns the per-channel tables: every color value maps to the fill color, alpha untouched."""
+        settings = self.make_settings(settings)
+        luts = identity_luts(present.shape[1])
+        if not settings.enabled or present.shape[1] < 4:
+            return luts
+        luts[:, :3] = self._settings_color(settings)
+        return luts
+
+    def apply(self, image_data: np.ndarray, settings=None) -> np.ndarray:
+        """
+        Fills the color channels with the selected HSV color, keeping the original alpha.
         
+        :param image: The OpenCV image to process.
+        :param settings: The settings to apply: ColorSettings, a settings dictionary, or None for the defaults.
+        :return: The processed image.
+        """
+        settings = self.make_settings(settings)
+        if not settings.enabled:
+            return image_data
+        
+        if image_data is None or image_data.shape[2] < 4:
+            return image_data
+
+        return self.apply_into(image_data, np.empty_like(image_data), settings)
+
+    def apply_into(self, src: np.ndarray, dst: np.ndarray, settings=None) -> np.ndarray:
+        """Writes the fill color and the alpha of src into dst. dst may be src itself."""
+        settings = self.make_settings(settings)
+        if not settings.enabled or src.shape[2] < 4:
+            return super().apply_into(src, dst, settings)
+
+        # Broadcast the constant color next to the untouched alpha
+        dst[:, :, :3] = self._settings_color(settings)
+        if dst is not src:
+            dst[:, :, 3] = src[:, :, 3]
+        return dst
+
+
+class ColorPanel(ToolPanel):
+    """The widgets of the ColorTool: an enable switch and Hue, Saturation and Brightness sliders."""
+    def create_gui(self, parent_frame):
+        # Imported here so the processing side of the tool works without tkinter (e.g. batch.py)
+        import tkinter as tk
+        from tkinter import ttk
+
         tool_frame = ttk.LabelFrame(parent_frame, text="Color (HSV)", padding=(10, 5))
         tool_frame.pack(pady=5, padx=10, fill=tk.X)
 
@@ -49,6 +138,7 @@ class ColorTool(BaseTool):
             command=self._on_change
         )
         self.hue_slider.pack(fill=tk.X, expand=True)
+        self.controller.watch_slider(self.hue_slider)
         self.hue_label = ttk.Label(tool_frame, text="0")
         self.hue_label.pack()
 
@@ -63,6 +153,7 @@ class ColorTool(BaseTool):
             command=self._on_change
         )
         self.sat_slider.pack(fill=tk.X, expand=True)
+        self.controller.watch_slider(self.sat_slider)
         self.sat_label = ttk.Label(tool_frame, text="100.0%")
         self.sat_label.pack()
 
@@ -77,6 +168,7 @@ class ColorTool(BaseTool):
             command=self._on_change
         )
         self.val_slider.pack(fill=tk.X, expand=True)
+        self.controller.watch_slider(self.val_slider)
         self.val_label = ttk.Label(tool_frame, text="0")
         self.val_label.pack()
 
@@ -90,68 +182,19 @@ class ColorTool(BaseTool):
         self.controller.apply_changes('color', self.get_settings())
 
     def get_settings(self):
-        """Returns the current color values from the sliders."""
-        return {
-            'enabled': self.enabled_var.get(),
-            'hue': self.hue_var.get(),
-            'saturation': self.sat_var.get(),
-            'value': self.val_var.get()
-        }
+        """Returns the settings shown by the sliders."""
+        return ColorSettings(
+            enabled=self.enabled_var.get(),
+            hue=self.hue_var.get(),
+            saturation=self.sat_var.get(),
+            value=self.val_var.get()
+        )
 
     def set_settings(self, settings):
-        """Sets the sliders' values from a loaded settings dictionary."""
-        self.enabled_var.set(settings.get('enabled', False))
-        self.hue_var.set(settings.get('hue', 0))
-        self.sat_var.set(settings.get('saturation', 100.0))
-        self.val_var.set(settings.get('value', 127.0))
+        """Sets the sliders' values from loaded settings."""
+        settings = self.tool.make_settings(settings)
+        self.enabled_var.set(settings.enabled)
+        self.hue_var.set(settings.hue)
+        self.sat_var.set(settings.saturation)
+        self.val_var.set(settings.value)
         self._on_change()
-
-    def apply(self, image_data: np.ndarray) -> np.ndarray:
-        """
-        Applies the transparency effect to the given image.
-        
-        :param image: The OpenCV image to process.
-        :return: The processed image with transparency applied.
-        """
-        if not self.enabled_var.get():
-            return image_data
-        
-        if image_data is None or image_data.shape[2] < 4:
-            return image_data
-        
-        settings = self.get_settings()
-
-        hue = settings.get('hue', 0)            # [-90, 90]
-        saturation = settings.get('saturation', 100)  # [0, 200]
-        value_scale = settings.get('value', 127)  # [0, 255]
-
-        # Clamp and normalize
-        hue = np.clip(hue, -180, 180)
-        sat = np.clip(saturation, 0, 200) / 100.0
-
-        # Separate alpha channel
-        gray_bgr = image_data[:, :, :3]
-        alpha = image_data[:, :, 3]
-
-        # Convert to grayscale
-        gray = cv2.cvtColor(gray_bgr, cv2.COLOR_BGR2GRAY).astype(np.float32)
-
-        # Normalize grayscale to [0, 1]
-        gray_norm = gray / 255.0
-
-        # Compute HSV with full value, apply hue and saturation
-        height, width = gray.shape
-        h_channel = np.full((height, width), hue % 180, dtype=np.uint8)
-        s_channel = np.full((height, width), int(np.clip(sat * 255, 0, 255)), dtype=np.uint8)
-        v_channel = np.full((height, width), value_scale, dtype=np.uint8)  # Always max brightness for color
-
-        hsv = cv2.merge([h_channel, s_channel, v_channel])
-
-        # Convert to BGR
-        color_bgr = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
-
-        # Merge with original alpha
-        b, g, r = cv2.split(color_bgr)
-        image_data = cv2.merge([b, g, r, alpha])
-
-        return image_data
\ No newline at end of file
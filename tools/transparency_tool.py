@@ -1,18 +1,146 @@
 # tools/transparency_tool.py
-import tkinter as tk
-from tkinter import ttk
-import numpy as np
+from __future__ import annotations
 
-from .base_tool import BaseTool
+from lazy_import import lazy_import
+from .base_tool import BaseTool, ToolPanel, ToolSettings, identity_luts
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from app_controller import AppController
 
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+class TransparencySettings(ToolSettings):
+    __slots__ = ("enabled", "alpha", "falloff", "alpha_offset")
+    DEFAULTS = {
+        'enabled': False,
+        'alpha': 0.0,         # Opacity, -100 to 100
+        'falloff': 1.0,       # Higher = more contrast on fade-in
+        'alpha_offset': 0.0,  # Added to every non-zero alpha, 0 to 255
+    }
+
+
 class TransparencyTool(BaseTool):
-    def create_gui(self, parent_frame, controller:"AppController"):
-        self.controller = controller
+    settings_class = TransparencySettings
+    # Number of opacity/falloff curves kept around while dragging sliders
+    LUT_CACHE_SIZE = 32
+    # The alpha offset depends on the largest alpha in the whole image. In the pipeline the tool runs through
+    # get_luts() instead, with value presence that has already been combined across bands.
+    band_safe = False
+
+    def __init__(self):
+        self._base_lut_cache = {}
+
+    def create_panel(self, controller: "AppController"):
+        return TransparencyPanel(self, controller)
+
+    def _base_lut(self, alpha_adjust, falloff):
+        """
+        Returns the float32 alpha curve for the given opacity/falloff settings,
+        evaluated once for all 256 possible input alpha values.
+        """
+        key = (alpha_adjust, falloff)
+        if key in self._base_lut_cache:
+            return self._base_lut_cache[key]
+
+        # Same math as the old per-pixel path, just run over the 256 possible inputs
+        alpha = np.arange(256, dtype=np.float32)
+
+        if alpha_adjust < 0:
+            # Fade out all pixels (alpha *= scale from 1 to 0)
+            scale = 1.0 + (alpha_adjust / 100.0)  # e.g., -50 → 0.5
+            alpha *= scale
+        else:
+            # Fade in partially transparent pixels (non-zero alpha)
+            scale = alpha_adjust / 100.0          # 0 to 1
+            normalized = alpha / 255.0            # 0 to 1
+            boosted = normalized + (1.0 - normalized) * (scale * (normalized ** falloff))
+            alpha = boosted * 255.0
+
+        if len(self._base_lut_cache) >= self.LUT_CACHE_SIZE:
+            self._base_lut_cache.pop(next(iter(self._base_lut_cache)), None)
+        self._base_lut_cache[key] = alpha
+        return alpha
+
+    def _alpha_lut(self, settings, present):
+        """
+        Builds the final uint8 alpha lookup table.
+
+        :param settings: The TransparencySettings.
+        :param present: Boolean array of length 256 marking which alpha values occur in the image,
+                        or None if the alpha offset is not in use.
+        :return: A uint8 array of length 256.
+        """
+        alpha_adjust = settings.alpha  # Range: -100 to 100
+        falloff = settings.falloff     # Higher = more contrast on fade-in
+        alpha_offset = settings.alpha_offset  # Range: 0 to 255
+
+        alpha = self._base_lut(alpha_adjust, falloff)
+
+        # Apply alpha offset, but don't exceed 255
+        if alpha_offset > 0 and present is not None and present.any():
+            # The only data-dependent part: the largest alpha actually produced for this image
+            max_alpha = alpha[present].max()
+            if max_alpha + alpha_offset > 255:
+                # Scale offset so the max alpha becomes 255
+                alpha_offset = 255 - max_alpha
+            alpha = np.where(alpha > 0, alpha + alpha_offset, alpha)  # Only apply offset to non-zero alpha
+
+        # Clip to the final table
+        return np.clip(alpha, 0, 255).astype(np.uint8)
+
+    def get_luts(self, settings, present):
+        """Returns the per-channel tables: color channels untouched, alpha remapped."""
+        settings = self.make_settings(settings)
+        luts = identity_luts(present.shape[1])
+        if not settings.enabled or present.shape[1] < 4:
+            return luts
+        luts[:, 3] = self._alpha_lut(settings, present[:, 3])
+        return luts
+
+    def apply(self, image_data: np.ndarray, settings=None) -> np.ndarray:
+        """
+        Applies the transparency effect to the given image.
         
+        :param image: The OpenCV image to process.
+        :param settings: The settings to apply: TransparencySettings, a settings dictionary, or None for the defaults.
+        :return: The processed image with transparency applied.
+        """
+        settings = self.make_settings(settings)
+        if not settings.enabled:
+            return image_data
+
+        if image_data is None or image_data.shape[2] < 4:
+            print("Warning: Attempted to apply transparency to an image without an alpha channel.")
+            return image_data
+
+        return self.apply_into(image_data, np.empty_like(image_data), settings)
+
+    def apply_into(self, src: np.ndarray, dst: np.ndarray, settings=None) -> np.ndarray:
+        """Writes the transparency effect for src into dst in one pass. dst may be src itself."""
+        settings = self.make_settings(settings)
+        if not settings.enabled or src.shape[2] < 4:
+            return super().apply_into(src, dst, settings)
+
+        present = None
+        if settings.alpha_offset > 0:
+            # Histogram of the alpha channel tells us which input values exist
+            present = cv2.calcHist([src], [3], None, [256], [0, 256]).ravel() > 0
+
+        luts = identity_luts(src.shape[2])
+        luts[:, 3] = self._alpha_lut(settings, present)
+        cv2.LUT(src, luts.reshape(256, 1, -1), dst=dst)
+        return dst
+
+
+class TransparencyPanel(ToolPanel):
+    """The widgets of the TransparencyTool."""
+    def create_gui(self, parent_frame):
+        # Imported here so the processing side of the tool works without tkinter (e.g. batch.py)
+        import tkinter as tk
+        from tkinter import ttk
+
         # Use a LabelFrame to group the tool's widgets
         tool_frame = ttk.LabelFrame(parent_frame, text="Traransparency", padding=(10, 5))
         tool_frame.pack(pady=5, padx=10, fill=tk.X)
@@ -42,6 +170,7 @@ class TransparencyTool(BaseTool):
             command=self._on_change
         )
         self.opacity_slider.pack(fill=tk.X, expand=True)
+        self.controller.watch_slider(self.opacity_slider)
 
         self.opacity_label = ttk.Label(tool_frame, text="0")
         self.opacity_label.pack()
@@ -56,6 +185,7 @@ class TransparencyTool(BaseTool):
             command=lambda v: self._on_change()
         )
         self.falloff_slider.pack(fill=tk.X, expand=True)
+        self.controller.watch_slider(self.falloff_slider)
 
         self.falloff_label = ttk.Label(tool_frame, text="0")
         self.falloff_label.pack()
@@ -71,6 +201,7 @@ class TransparencyTool(BaseTool):
             command=lambda v: self._on_change()
         )
         self.alpha_offset_slider.pack(fill=tk.X, expand=True)
+        self.controller.watch_slider(self.alpha_offset_slider)
         self.alpha_offset_label = ttk.Label(tool_frame, text="0")
         self.alpha_offset_label.pack()
 
@@ -83,73 +214,19 @@ class TransparencyTool(BaseTool):
         self.controller.apply_changes('transparency', self.get_settings())
 
     def get_settings(self):
-        """Returns the current alpha value from the slider."""
-        return {
-            'enabled': self.enabled_var.get(),
-            'alpha': self.opacity_var.get(),
-            'falloff': self.falloff_var.get(),
-            'alpha_offset': self.alpha_offset_var.get()
-        }
+        """Returns the settings shown by the widgets."""
+        return TransparencySettings(
+            enabled=self.enabled_var.get(),
+            alpha=self.opacity_var.get(),
+            falloff=self.falloff_var.get(),
+            alpha_offset=self.alpha_offset_var.get()
+        )
 
     def set_settings(self, settings):
-        """Sets the slider's value from a loaded settings dictionary."""
-        self.enabled_var.set(settings.get('enabled', False))
-        self.opacity_var.set(settings.get('alpha', 0.0))
-        self.falloff_var.set(settings.get('falloff', 1.0))
-        self.alpha_offset_var.set(settings.get('alpha_offset', 0.0))
+        """Sets the widgets from loaded settings."""
+        settings = self.tool.make_settings(settings)
+        self.enabled_var.set(settings.enabled)
+        self.opacity_var.set(settings.alpha)
+        self.falloff_var.set(settings.falloff)
+        self.alpha_offset_var.set(settings.alpha_offset)
         self._on_change()  # Update labels and notify controller
-
-    def apply(self, image_data: np.ndarray) -> np.ndarray:
-        """
-        Applies the transparency effect to the given image.
-        
-        :param image: The OpenCV image to process.
-        :return: The processed image with transparency applied.
-        """
-        if not self.enabled_var.get():
-            return image_data
-
-        if image_data is None or image_data.shape[2] < 4:
-            print("Warning: Attempted to apply transparency to an image without an alpha channel.")
-            return image_data
-        
-        settings = self.get_settings()
-
-        alpha_adjust = settings.get('alpha', 0)  # Range: -100 to 100
-        falloff = settings.get('falloff', 1.0)   # Higher = more contrast on fade-in
-        alpha_offset = settings.get('alpha_offset', 0.0)  # Range: 0 to 255
-
-
-        # Get alpha channel
-        alpha = image_data[:, :, 3].astype(np.float32)
-
-        # if alpha_adjust == 0:
-        #     return  image_data# No change
-
-        if alpha_adjust < 0:
-            # Fade out all pixels (alpha *= scale from 1 to 0)
-            scale = 1.0 + (alpha_adjust / 100.0)  # e.g., -50 → 0.5
-            alpha *= scale
-        else:
-            # Fade in partially transparent pixels (non-zero alpha)
-            scale = alpha_adjust / 100.0          # 0 to 1
-            normalized = alpha / 255.0            # 0 to 1
-            boosted = normalized + (1.0 - normalized) * (scale * (normalized ** falloff))
-            alpha = boosted * 255.0
-
-        # Apply alpha offset, but don't exceed 255
-        if alpha_offset > 0:
-            max_alpha = np.max(alpha)
-            if max_alpha + alpha_offset > 255:
-                # Scale offset so the max alpha becomes 255
-                alpha_offset = 255 - max_alpha
-            alpha = np.where( alpha > 0, alpha + alpha_offset, alpha)  # Only apply offset to non-zero alpha
-            # alpha += alpha_offset
-
-        # Clip and apply
-        alpha = np.clip(alpha, 0, 255).astype(np.uint8)
-
-        modified_image_data = image_data.copy()
-        modified_image_data[:, :, 3] = alpha
-
-        return modified_image_data
\ No newline at end of file